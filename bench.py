@@ -0,0 +1,389 @@
+# -*- coding: utf8 -*-
+"""Micro benchmarks for fuzzywuzzy.py, run with: python3 bench.py"""
+from __future__ import print_function, unicode_literals
+import random
+import timeit
+
+import fuzzywuzzy
+
+
+def timed(label, func, number=2000, repeat=5):
+    best = min(timeit.repeat(func, number=number, repeat=repeat))
+    print('{0:<60} {1:>9.2f} us'.format(label, 1e6 * best / number))
+
+
+def make_catalog(size, seed=0):
+    """Deterministic catalog of team-like names"""
+    rng = random.Random(seed)
+    words = ("new york mets atlanta braves chicago cubs white sox boston red "
+             "philadelphia phillies pittsburgh pirates los angeles dodgers "
+             "san francisco giants cirque du soleil zarkana las vegas "
+             "bellagio united city rovers athletic").split()
+    return [' '.join(rng.choice(words) for _ in range(rng.randint(2, 6)))
+            for _ in range(size)]
+
+
+def bench_containment():
+    """Partial scorers when the shorter string occurs verbatim in the longer
+    one, against the same strings with the containment broken by one
+    character, which has to go through the matching blocks."""
+    address = "flat 4 221b baker street marylebone london nw1 6xe united kingdom"
+    contained = "221b baker street"
+    near_miss = "221b baker streat"
+    timed('partial_ratio, contained',
+          lambda: fuzzywuzzy.partial_ratio(contained, address))
+    timed('partial_ratio, near miss',
+          lambda: fuzzywuzzy.partial_ratio(near_miss, address))
+    timed('partial_token_set_ratio, token subset',
+          lambda: fuzzywuzzy.partial_token_set_ratio("london baker street", address))
+    timed('partial_token_set_ratio, near miss',
+          lambda: fuzzywuzzy.partial_token_set_ratio("london baker streat", address))
+    timed('partial_token_sort_ratio, contained',
+          lambda: fuzzywuzzy.partial_token_sort_ratio("london marylebone nw1", address))
+    timed('partial_token_sort_ratio, near miss',
+          lambda: fuzzywuzzy.partial_token_sort_ratio("london marylebone nw2", address))
+
+
+def bench_score_cutoff():
+    """extractBests() with a high score_cutoff, where most choices can be
+    rejected from their length or character histogram alone"""
+    catalog = make_catalog(2000)
+    query = "new york mets vs atlanta braves"
+    for scorer in (fuzzywuzzy.ratio, fuzzywuzzy.QRatio, fuzzywuzzy.WRatio):
+        timed('extractBests, {0}, score_cutoff=80'.format(scorer.__name__),
+              lambda: fuzzywuzzy.extractBests(query, catalog, scorer=scorer,
+                                              score_cutoff=80),
+              number=3, repeat=3)
+
+
+def bench_top_k():
+    """extract() top-5, where the fifth best score becomes a rising cutoff"""
+    catalog = make_catalog(2000)
+    query = "new york mets vs atlanta braves"
+    for scorer in (fuzzywuzzy.ratio, fuzzywuzzy.WRatio):
+        timed('extract, {0}, limit=5'.format(scorer.__name__),
+              lambda: fuzzywuzzy.extract(query, catalog, scorer=scorer),
+              number=3, repeat=3)
+
+
+def bench_extract_one():
+    """extractOne() when the catalog holds the query verbatim"""
+    catalog = make_catalog(2000)
+    query = catalog[1500]
+    timed('extractOne, WRatio, exact match present',
+          lambda: fuzzywuzzy.extractOne(query, catalog), number=3, repeat=3)
+
+
+def bench_choice_index():
+    """Repeated queries against a fixed catalog, from the plain list and from
+    a ChoiceIndex that processed and tokenized it once"""
+    catalog = make_catalog(2000)
+    index = fuzzywuzzy.ChoiceIndex(catalog)
+    queries = make_catalog(10, seed=1)
+    for label, choices in (('list', catalog), ('ChoiceIndex', index)):
+        timed('extract x10, WRatio, {0}'.format(label),
+              lambda: [fuzzywuzzy.extract(query, choices) for query in queries],
+              number=1, repeat=3)
+
+
+def bench_shared_tokens():
+    """extract() through a ChoiceIndex scoring only the choices that share a
+    token with the query, against scoring every choice"""
+    catalog = make_catalog(2000) + ['vancouver canucks %d' % i for i in range(2000)]
+    queries = ['canucks %d' % i for i in range(0, 2000, 200)]
+    for min_shared_tokens in (0, 1):
+        index = fuzzywuzzy.ChoiceIndex(catalog, min_shared_tokens=min_shared_tokens)
+        timed('extract x10, WRatio, min_shared_tokens={0}'.format(min_shared_tokens),
+              lambda: [fuzzywuzzy.extract(query, index) for query in queries],
+              number=1, repeat=3)
+        timed('extractBests x10, WRatio, score_cutoff=90, min_shared_tokens={0}'.format(min_shared_tokens),
+              lambda: [fuzzywuzzy.extractBests(query, index, score_cutoff=90) for query in queries],
+              number=1, repeat=3)
+
+
+def bench_qgram_filter():
+    """extractBests() with ratio() and a score_cutoff, where a ChoiceIndex
+    skips the choices without enough q-grams in common with the query"""
+    catalog = make_catalog(2000)
+    index = fuzzywuzzy.ChoiceIndex(catalog, scorer=fuzzywuzzy.ratio)
+    query = "new yrok mets vs atlanta brave"
+    for cutoff in (80, 90):
+        for label, choices in (('list', catalog), ('ChoiceIndex', index)):
+            timed('extractBests, ratio, score_cutoff={0}, {1}'.format(cutoff, label),
+                  lambda: fuzzywuzzy.extractBests(query, choices, scorer=fuzzywuzzy.ratio,
+                                                  score_cutoff=cutoff),
+                  number=10, repeat=3)
+
+
+def bench_length_band():
+    """extractBests() with WRatio and a high score_cutoff, where a ChoiceIndex
+    only scores the choices in the feasible band of processed lengths"""
+    catalog = make_catalog(2000)
+    index = fuzzywuzzy.ChoiceIndex(catalog)
+    query = "mets braves"
+    for cutoff in (61, 91):
+        for label, choices in (('list', catalog), ('ChoiceIndex', index)):
+            timed('extractBests, WRatio, score_cutoff={0}, {1}'.format(cutoff, label),
+                  lambda: fuzzywuzzy.extractBests(query, choices, score_cutoff=cutoff),
+                  number=10, repeat=3)
+
+
+def bench_bk_tree():
+    """All choices within an edit distance of a query, from a BKTree against
+    a linear scan measuring the distance to every choice"""
+    catalog = make_catalog(2000)
+    processed = [fuzzywuzzy.full_process(choice) for choice in catalog]
+    tree = fuzzywuzzy.BKTree(catalog)
+    query = fuzzywuzzy.full_process(catalog[700][:-1])
+    for max_distance in (1, 3):
+        timed('within {0}, linear scan'.format(max_distance),
+              lambda: [choice for choice in processed
+                       if fuzzywuzzy.indel_distance(query, choice) <= max_distance],
+              number=10, repeat=3)
+        timed('within {0}, BKTree'.format(max_distance),
+              lambda: tree.find(query, max_distance), number=10, repeat=3)
+
+
+def bench_deletion_index():
+    """Single-typo lookups of short names, from a DeletionIndex against
+    extractOne() over the whole catalog"""
+    rng = random.Random(0)
+    names = sorted(set(''.join(rng.choice('abcdefghijklmnopqrstuvwxyz')
+                               for _ in range(rng.randint(4, 9)))
+                       for _ in range(5000)))
+    index = fuzzywuzzy.DeletionIndex(names, max_distance=1)
+    query = names[2500][1:]
+    timed('single typo, extractOne', lambda: fuzzywuzzy.extractOne(query, names),
+          number=3, repeat=3)
+    timed('single typo, DeletionIndex', lambda: index.extractOne(query),
+          number=100, repeat=3)
+
+
+def bench_lsh_dedupe():
+    """dedupe() against lsh_dedupe() and cluster_dedupe() on a list with
+    near duplicates"""
+    records = make_catalog(300, seed=2)
+    timed('dedupe, 300 records', lambda: fuzzywuzzy.dedupe(records), number=1, repeat=1)
+    timed('lsh_dedupe, 300 records', lambda: fuzzywuzzy.lsh_dedupe(records), number=1, repeat=1)
+    timed('cluster_dedupe, 300 records', lambda: fuzzywuzzy.cluster_dedupe(records), number=1, repeat=1)
+    timed('cluster_dedupe, LSH candidates, 300 records',
+          lambda: fuzzywuzzy.cluster_dedupe(
+              records, candidate_pairs=fuzzywuzzy.lsh_candidate_pairs(records)),
+          number=1, repeat=1)
+
+
+def bench_parallel():
+    """extract() against extract_parallel() with a ProcessPoolExecutor kept
+    across calls"""
+    from concurrent.futures import ProcessPoolExecutor
+    catalog = make_catalog(20000)
+    query = "new york mets vs atlanta braves"
+    timed('extract, WRatio, 20000 choices',
+          lambda: fuzzywuzzy.extract(query, catalog), number=1, repeat=3)
+    with ProcessPoolExecutor() as executor:
+        timed('extract_parallel, WRatio, 20000 choices',
+              lambda: fuzzywuzzy.extract_parallel(query, catalog, executor=executor),
+              number=1, repeat=3)
+
+
+def bench_cdist():
+    """Every score of many queries, from extractWithoutOrder() per query
+    against one cdist() call processing both sides once"""
+    catalog = make_catalog(500)
+    queries = make_catalog(20, seed=1)
+    timed('extractWithoutOrder x20, WRatio, 500 choices',
+          lambda: [list(fuzzywuzzy.extractWithoutOrder(query, catalog)) for query in queries],
+          number=1, repeat=3)
+    timed('cdist 20 x 500, WRatio', lambda: fuzzywuzzy.cdist(queries, catalog),
+          number=1, repeat=3)
+    timed('cdist 20 x 500, WRatio, score_cutoff=80, sparse',
+          lambda: fuzzywuzzy.cdist(queries, catalog, score_cutoff=80, sparse=True),
+          number=1, repeat=3)
+
+
+def bench_extract_many():
+    """extract() per query against extract_many() processing the choices
+    once for all the queries"""
+    catalog = make_catalog(2000)
+    queries = make_catalog(10, seed=1)
+    timed('extract x10, token_set_ratio',
+          lambda: [fuzzywuzzy.extract(query, catalog, scorer=fuzzywuzzy.token_set_ratio)
+                   for query in queries],
+          number=1, repeat=3)
+    timed('extract_many, 10 queries, token_set_ratio',
+          lambda: fuzzywuzzy.extract_many(queries, catalog, scorer=fuzzywuzzy.token_set_ratio),
+          number=1, repeat=3)
+
+
+def bench_async():
+    """extract() against extract_async(), and the longest the event loop
+    goes without running other tasks during extract_async()"""
+    import asyncio
+    catalog = make_catalog(2000)
+    query = "new york mets vs atlanta braves"
+
+    async def longest_stall():
+        loop = asyncio.get_event_loop()
+        gaps = []
+
+        async def ticker():
+            last = loop.time()
+            while True:
+                await asyncio.sleep(0)
+                now = loop.time()
+                gaps.append(now - last)
+                last = now
+        task = asyncio.ensure_future(ticker())
+        await fuzzywuzzy.extract_async(query, catalog, slice_size=100)
+        task.cancel()
+        return max(gaps)
+
+    timed('extract, WRatio, 2000 choices', lambda: fuzzywuzzy.extract(query, catalog),
+          number=1, repeat=3)
+    timed('extract_async, WRatio, 2000 choices',
+          lambda: asyncio.run(fuzzywuzzy.extract_async(query, catalog, slice_size=100)),
+          number=1, repeat=3)
+    stall = asyncio.run(longest_stall())
+    print('{0:<60} {1:>9.2f} us'.format('longest event loop stall, slice_size=100', 1e6 * stall))
+
+
+def bench_cache():
+    """The same query scored against a catalog by several scorers, without
+    and with the cache of processed strings and their tokens"""
+    catalog = make_catalog(500)
+    query = "new york mets vs atlanta braves"
+    scorers = (fuzzywuzzy.QRatio, fuzzywuzzy.WRatio, fuzzywuzzy.token_sort_ratio,
+               fuzzywuzzy.token_set_ratio)
+
+    def score_all():
+        for scorer in scorers:
+            for choice in catalog:
+                scorer(query, choice)
+
+    def process_all():
+        for choice in catalog:
+            fuzzywuzzy._process_and_sort(choice, True)
+    timed('4 scorers x 500 choices, no cache', score_all, number=1, repeat=3)
+    timed('_process_and_sort x 500 choices, no cache', process_all, number=10, repeat=3)
+    fuzzywuzzy.enable_cache()
+    score_all()
+    timed('4 scorers x 500 choices, cache', score_all, number=1, repeat=3)
+    timed('_process_and_sort x 500 choices, cache', process_all, number=10, repeat=3)
+    print(fuzzywuzzy.cache_info())
+    fuzzywuzzy.disable_cache()
+    large = make_catalog(20000)
+    timed('extractBests token_set_ratio x 20000 choices, no cache',
+          lambda: fuzzywuzzy.extractBests(query, large, scorer=fuzzywuzzy.token_set_ratio),
+          number=1, repeat=3)
+    fuzzywuzzy.enable_cache()
+    timed('extractBests token_set_ratio x 20000 choices, cache',
+          lambda: fuzzywuzzy.extractBests(query, large, scorer=fuzzywuzzy.token_set_ratio),
+          number=1, repeat=3)
+    print(fuzzywuzzy.cache_info())
+    fuzzywuzzy.disable_cache()
+
+
+def bench_full_process_batch():
+    """full_process() per choice against full_process_batch(), and building
+    a ChoiceIndex, which processes its choices in a batch"""
+    catalog = make_catalog(20000)
+    for force_ascii in (False, True):
+        timed('full_process x20000, force_ascii={0}'.format(force_ascii),
+              lambda: [fuzzywuzzy.full_process(choice, force_ascii) for choice in catalog],
+              number=1, repeat=5)
+        timed('full_process_batch, 20000 choices, force_ascii={0}'.format(force_ascii),
+              lambda: fuzzywuzzy.full_process_batch(catalog, force_ascii),
+              number=1, repeat=5)
+    timed('ChoiceIndex, 20000 choices', lambda: fuzzywuzzy.ChoiceIndex(catalog),
+          number=1, repeat=5)
+
+
+def bench_asciidammit():
+    """asciidammit() and full_process(force_ascii=True) on the mixed_strings
+    fixtures of publictest-full.py"""
+    mixed_strings = [
+        "Lorem Ipsum is simply dummy text of the printing and typesetting industry.",
+        "C'est la vie",
+        "Ã‡a va?",
+        "CÃ£es danados",
+        "\xacCamarÃµes assados",
+        "a\xac\u1234\u20ac\U00008000",
+        "\u00C1"
+    ]
+    timed('asciidammit, mixed_strings',
+          lambda: [fuzzywuzzy.asciidammit(s) for s in mixed_strings], number=20000)
+    timed('full_process, force_ascii=True, mixed_strings',
+          lambda: [fuzzywuzzy.full_process(s, force_ascii=True) for s in mixed_strings],
+          number=20000)
+
+
+def bench_scorer_objects():
+    """extract() over a list with built-in scorers, and with a custom scorer
+    as a plain function against a Scorer with a ScoringContext entry point"""
+    catalog = make_catalog(2000)
+    query = "new york mets vs atlanta braves"
+    for scorer in (fuzzywuzzy.ratio, fuzzywuzzy.token_sort_ratio, fuzzywuzzy.WRatio):
+        timed('extractBests, {0}, score_cutoff=50'.format(scorer.__name__),
+              lambda: fuzzywuzzy.extractBests(query, catalog, scorer=scorer, score_cutoff=50),
+              number=3, repeat=3)
+
+    def shared_tokens(s1, s2, force_ascii=True, do_full_process=True):
+        if do_full_process:
+            s1 = fuzzywuzzy.full_process(s1, force_ascii)
+            s2 = fuzzywuzzy.full_process(s2, force_ascii)
+        return len(set(s1.split()) & set(s2.split()))
+    scorer = fuzzywuzzy.Scorer(shared_tokens, force_ascii=True, score_contexts=lambda c1, c2, score_cutoff=0:
+                               len(c1.token_set & c2.token_set))
+    for label, func in (('function', shared_tokens), ('Scorer', scorer)):
+        timed('extract, custom scorer, {0}'.format(label),
+              lambda: fuzzywuzzy.extract(query, catalog, scorer=func, processor=None),
+              number=3, repeat=3)
+
+
+def bench_token_set():
+    """Token set scorers, which score the sorted intersection against each
+    sorted intersection and difference from the lengths alone and only
+    compare the two combined strings"""
+    catalog = make_catalog(2000)
+    index = fuzzywuzzy.ChoiceIndex(catalog)
+    queries = make_catalog(10, seed=1)
+    for scorer in (fuzzywuzzy.token_set_ratio, fuzzywuzzy.partial_token_set_ratio,
+                   fuzzywuzzy.WRatio):
+        index.prepare(scorer=scorer)
+        for score_cutoff in (0, 80):
+            timed('extractBests x10, {0}, score_cutoff={1}, ChoiceIndex'.format(
+                      scorer.__name__, score_cutoff),
+                  lambda: [fuzzywuzzy.extractBests(query, index, scorer=scorer,
+                                                   score_cutoff=score_cutoff)
+                           for query in queries],
+                  number=1, repeat=3)
+
+
+BENCHMARKS = [
+    bench_containment,
+    bench_score_cutoff,
+    bench_top_k,
+    bench_extract_one,
+    bench_choice_index,
+    bench_shared_tokens,
+    bench_qgram_filter,
+    bench_length_band,
+    bench_bk_tree,
+    bench_deletion_index,
+    bench_lsh_dedupe,
+    bench_parallel,
+    bench_cdist,
+    bench_extract_many,
+    bench_async,
+    bench_cache,
+    bench_full_process_batch,
+    bench_asciidammit,
+    bench_scorer_objects,
+    bench_token_set,
+]
+
+
+if __name__ == '__main__':
+    for benchmark in BENCHMARKS:
+        print(benchmark.__name__)
+        benchmark()
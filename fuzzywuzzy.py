@@ -1,17 +1,30 @@
 from __future__ import unicode_literals
 import re
-import string
 import sys
 import functools
 import heapq
+import bisect
 import logging
+import math
+from collections import Counter, OrderedDict, namedtuple
 from functools import partial
 import platform
 import warnings
+import random
+import zlib
+import multiprocessing
+import pickle
+import asyncio
+import itertools
+import threading
+from concurrent.futures import ProcessPoolExecutor
+try:
+    import numpy
+except ImportError:
+    numpy = None
 from difflib import SequenceMatcher
 PY3 = sys.version_info[0] == 3
-if PY3:
-    string = str
+string = str
 
 
 class StringProcessor(object):
@@ -68,35 +81,34 @@ def check_empty_string(func):
 
 
 bad_chars = str('').join([chr(i) for i in range(128, 256)])
-if PY3:
-    translation_table = dict((ord(c), None) for c in bad_chars)
-    unicode = str
+translation_table = dict((ord(c), None) for c in bad_chars)
+unicode = str
+_ascii_table = [chr(i) for i in range(128)] + [None] * 128
+if hasattr(str, 'isascii'):
+    _is_ascii = str.isascii
+else:
+    def _is_ascii(s):
+        return False
 
 
 def asciionly(s):
-    if PY3:
-        return s.translate(translation_table)
-    else:
-        return s.translate(None, bad_chars)
+    if _is_ascii(s):
+        return s
+    return s.translate(_ascii_table)
 
 
 def asciidammit(s):
-    if type(s) is str:
-        return asciionly(s)
-    elif type(s) is unicode:
-        return asciionly(s.encode('ascii', 'ignore'))
-    else:
-        return asciidammit(unicode(s))
+    if type(s) is not str:
+        s = str(s)
+    return asciionly(s)
 
 
 def make_type_consistent(s1, s2):
-    """If both objects aren't either both string or unicode instances force them to unicode"""
+    """If both objects aren't strings force them to strings"""
     if isinstance(s1, str) and isinstance(s2, str):
         return s1, s2
-    elif isinstance(s1, unicode) and isinstance(s2, unicode):
-        return s1, s2
     else:
-        return unicode(s1), unicode(s2)
+        return str(s1), str(s2)
 
 
 def full_process(s, force_ascii=False):
@@ -105,6 +117,12 @@ def full_process(s, force_ascii=False):
         -- trim whitespace
         -- force to lower case
         if force_ascii == True, force convert to ascii"""
+    if _context_cache is not None:
+        return _context_cache.get(s, force_ascii, True).processed
+    return _full_process(s, force_ascii)
+
+
+def _full_process(s, force_ascii=False):
     if s is None:
         return ''
     if force_ascii:
@@ -116,24 +134,307 @@ def full_process(s, force_ascii=False):
     return string_out
 
 
+_batch_regex = re.compile('(?ui)[^\\w\\x00]')
+
+
+def full_process_batch(strings, force_ascii=False):
+    """Return [full_process(s, force_ascii) for s in strings], processing
+    the strings joined by NUL characters in a single pass. Strings holding
+    a NUL or a capital sigma, whose lower case depends on what follows
+    it, and objects other than strings are processed one by one."""
+    strings = list(strings)
+    if not strings:
+        return []
+    try:
+        joined = '\x00'.join(strings)
+    except TypeError:
+        joined = None
+    if joined is not None and joined.count('\x00') == len(strings
+        ) - 1 and '\u03a3' not in joined:
+        return [s.strip() for s in _batch_process(joined, force_ascii).
+            split('\x00')]
+    processed = [None] * len(strings)
+    batch = []
+    for position, s in enumerate(strings):
+        if type(s) is str and '\x00' not in s and '\u03a3' not in s:
+            batch.append(position)
+        else:
+            processed[position] = _full_process(s, force_ascii)
+    joined = _batch_process('\x00'.join([strings[position] for position in
+        batch]), force_ascii)
+    for position, s in zip(batch, joined.split('\x00')):
+        processed[position] = s.strip()
+    return processed
+
+
+def _batch_process(joined, force_ascii):
+    if force_ascii:
+        joined = asciionly(joined)
+    return _batch_regex.sub(' ', joined).lower()
+
+
 def intr(n):
     """Returns a correctly rounded integer"""
     return int(round(n))
 
 
+def _common_char_count(s1, s2):
+    """Upper bound on the number of characters any alignment of s1 and s2
+    can match, from their character histograms"""
+    return sum((Counter(s1) & Counter(s2)).values())
+
+
+def _ratio_upper_bound(s1, s2):
+    """Upper bound on 100 * ratio(s1, s2) from the string lengths alone"""
+    lensum = len(s1) + len(s2)
+    return 200.0 * min(len(s1), len(s2)) / lensum
+
+
+def _scaled_cutoff(score_cutoff, scale):
+    """Return the lowest score a sub-scorer must reach for score * scale to
+    still round up to score_cutoff"""
+    if score_cutoff <= 0:
+        return 0
+    return max(0, int(math.ceil((score_cutoff - 0.5) / scale - 1e-09)))
+
+
+BIT_PARALLEL_MAX_LEN = 64
+QGRAM_SIZE = 2
+
+
+def _pattern_masks(pattern):
+    """Map every character of pattern to the bit set of its positions"""
+    masks = {}
+    bit = 1
+    for c in pattern:
+        masks[c] = masks.get(c, 0) | bit
+        bit <<= 1
+    return masks
+
+
+def _lcs_bit_parallel(masks, pattern_len, text):
+    """Hyyro's bit-vector LCS of a pattern, given as _pattern_masks(), and text.
+
+    Each zero bit of the row vector marks a pattern position that ends a
+    common subsequence, so one addition and a few logical operations per
+    character of text replace a full row of the dynamic programming table.
+    """
+    full = (1 << pattern_len) - 1
+    row = full
+    for c in text:
+        matches = row & masks.get(c, 0)
+        row = ((row + matches) | (row - matches)) & full
+    return pattern_len - bin(row).count('1')
+
+
+def _lcs_dynamic(s1, s2):
+    if len(s1) < len(s2):
+        s1, s2 = s2, s1
+    row = [0] * (len(s2) + 1)
+    for c1 in s1:
+        prev_diag = 0
+        for j, c2 in enumerate(s2):
+            prev_row = row[j + 1]
+            if c1 == c2:
+                row[j + 1] = prev_diag + 1
+            elif row[j] > prev_row:
+                row[j + 1] = row[j]
+            prev_diag = prev_row
+    return row[-1]
+
+
+def lcs_length(s1, s2):
+    """Return the length of the longest common subsequence of s1 and s2"""
+    if len(s1) > len(s2):
+        s1, s2 = s2, s1
+    if not s1:
+        return 0
+    if len(s1) <= BIT_PARALLEL_MAX_LEN:
+        return _lcs_bit_parallel(_pattern_masks(s1), len(s1), s2)
+    return _lcs_dynamic(s1, s2)
+
+
+def indel_distance(s1, s2):
+    """Return the number of insertions and deletions needed to turn s1 into s2"""
+    return len(s1) + len(s2) - 2 * lcs_length(s1, s2)
+
+
+def levenshtein_distance(s1, s2):
+    """Return the number of insertions, deletions and substitutions needed
+    to turn s1 into s2"""
+    if len(s1) < len(s2):
+        s1, s2 = s2, s1
+    row = list(range(len(s2) + 1))
+    for i, c1 in enumerate(s1, 1):
+        prev_diag = row[0]
+        row[0] = i
+        for j, c2 in enumerate(s2, 1):
+            prev_row = row[j]
+            row[j] = min(prev_row + 1, row[j - 1] + 1, prev_diag + (c1 != c2))
+            prev_diag = prev_row
+    return row[-1]
+
+
+class SimilarityBackend(object):
+    """
+    Base class for the engines ratio() and partial_ratio() delegate to.
+
+    A backend turns two strings into a similarity between 0.0 and 1.0
+    and, for partial_ratio(), supplies the matching blocks used to pick
+    the windows of the longer string that are compared to the shorter.
+    Backends whose ratio never exceeds 2*LCS/(len(s1)+len(s2)) set
+    lcs_bounded, which lets scorers give up on a score_cutoff from the
+    lengths and character counts of the strings, and searches discard
+    choices from q-gram counts.
+    """
+    name = None
+    lcs_bounded = False
+
+    def ratio(self, s1, s2):
+        raise NotImplementedError
+
+    def matching_blocks(self, s1, s2):
+        return SequenceMatcher(None, s1, s2).get_matching_blocks()
+
+    def prepare(self, s1):
+        """Return a function f(s2) -> ratio(s1, s2) for scoring s1 against
+        many strings, doing the work that only depends on s1 once. The
+        default does no such work; the difflib backend keeps it, since
+        SequenceMatcher indexes s2, which changes with every call."""
+        return partial(self.ratio, s1)
+
+    def prefix_ratio(self, len1, len2):
+        """Return ratio(s1, s2) for a string s1 of length len1 starting a
+        string s2 of length len2, or None if it takes comparing them."""
+        return None
+
+
+class DifflibBackend(SimilarityBackend):
+    """
+    Compatibility backend built on difflib.SequenceMatcher.
+
+    This is the historical behaviour of fuzzywuzzy and the default.
+    """
+    name = 'difflib'
+    lcs_bounded = True
+
+    def ratio(self, s1, s2):
+        return SequenceMatcher(None, s1, s2).ratio()
+
+    def prefix_ratio(self, len1, len2):
+        if len2 >= 200:
+            return None
+        return 2.0 * len1 / (len1 + len2)
+
+
+class IndelBackend(SimilarityBackend):
+    """
+    Pure python backend scoring with the Indel distance.
+
+    The similarity is 1 - indel_distance / (len(s1) + len(s2)), which is
+    2 * lcs_length / (len(s1) + len(s2)). SequenceMatcher computes the same
+    formula but counts the characters of its greedy longest-block matching
+    rather than of a true longest common subsequence, so this backend never
+    scores lower than the difflib one and is symmetric in its arguments.
+    Scores differ where the greedy matching misses characters:
+
+        ========================  ========================  =======  =====
+        s1                        s2                        difflib  indel
+        ========================  ========================  =======  =====
+        new york mets             new YORK mets             69       69
+        kitten                    sitting                   62       62
+        new atlanta chicago       new york braves           29       35
+        cubs atlanta braves       chicago new cubs          23       34
+        braves york new           mets chicago york         38       44
+        'a' * 150 + 'b' * 150     'b' * 150 + 'a' * 150     0        50
+        '0123456789' * 25         '1234567890' * 25         0        100
+        ========================  ========================  =======  =====
+
+    The last two rows come from SequenceMatcher's autojunk heuristic, which
+    ignores characters making up more than 1% of a string of 200 or more
+    characters.
+    """
+    name = 'indel'
+    lcs_bounded = True
+
+    def ratio(self, s1, s2):
+        lensum = len(s1) + len(s2)
+        if lensum == 0:
+            return 1.0
+        return 2.0 * lcs_length(s1, s2) / lensum
+
+    def prefix_ratio(self, len1, len2):
+        return 2.0 * len1 / (len1 + len2)
+
+    def prepare(self, s1):
+        if not s1 or len(s1) > BIT_PARALLEL_MAX_LEN:
+            return partial(self.ratio, s1)
+        masks = _pattern_masks(s1)
+        len1 = len(s1)
+
+        def ratio_to(s2):
+            lcs = _lcs_bit_parallel(masks, len1, s2)
+            return 2.0 * lcs / (len1 + len(s2))
+        return ratio_to
+
+
+similarity_backends = {
+    DifflibBackend.name: DifflibBackend(),
+    IndelBackend.name: IndelBackend(),
+}
+similarity_backend = similarity_backends['difflib']
+
+
+def set_similarity_backend(backend):
+    """
+    Select the engine used by ratio(), partial_ratio() and every scorer
+    built on them.
+
+    :param backend: a SimilarityBackend instance or the name of a
+        registered one ('difflib' or 'indel')
+    :return: the previously selected backend
+    """
+    global similarity_backend
+    if not isinstance(backend, SimilarityBackend):
+        try:
+            backend = similarity_backends[backend]
+        except KeyError:
+            raise ValueError(u"Unknown similarity backend: '{0}'".format(
+                backend))
+    previous = similarity_backend
+    similarity_backend = backend
+    return previous
+
+
 @check_for_none
-@check_empty_string
-def ratio(s1, s2):
+def ratio(s1, s2, score_cutoff=0):
+    return _ratio(s1, s2, score_cutoff)
+
+
+def _ratio(s1, s2, score_cutoff=0):
+    if len(s1) == 0 or len(s2) == 0:
+        return 0
     s1, s2 = make_type_consistent(s1, s2)
-    m = SequenceMatcher(None, s1, s2)
-    return intr(100 * m.ratio())
+    if score_cutoff > 0 and similarity_backend.lcs_bounded:
+        if intr(_ratio_upper_bound(s1, s2)) < score_cutoff:
+            return 0
+        common = _common_char_count(s1, s2)
+        if intr(200.0 * common / (len(s1) + len(s2))) < score_cutoff:
+            return 0
+    score = intr(100 * similarity_backend.ratio(s1, s2))
+    return score if score >= score_cutoff else 0
 
 
 @check_for_none
-@check_empty_string
-def partial_ratio(s1, s2):
+def partial_ratio(s1, s2, score_cutoff=0):
     """"Return the ratio of the most similar substring
     as a number between 0 and 100."""
+    return _partial_ratio(s1, s2, score_cutoff)
+
+
+def _partial_ratio(s1, s2, score_cutoff=0):
+    if len(s1) == 0 or len(s2) == 0:
+        return 0
     s1, s2 = make_type_consistent(s1, s2)
     if len(s1) <= len(s2):
         shorter = s1
@@ -141,105 +442,276 @@ def partial_ratio(s1, s2):
     else:
         shorter = s2
         longer = s1
-    m = SequenceMatcher(None, shorter, longer)
-    blocks = m.get_matching_blocks()
+    if shorter in longer:
+        return 100
+    if score_cutoff > 0 and similarity_backend.lcs_bounded:
+        common = _common_char_count(shorter, longer)
+        if intr(200.0 * common / (len(shorter) + common)) < score_cutoff:
+            return 0
+    backend = similarity_backend
+    blocks = backend.matching_blocks(shorter, longer)
+    ratio_to_shorter = backend.prepare(shorter)
+    seen_starts = set()
     scores = []
     for block in blocks:
         long_start = block[1] - block[0] if block[1] - block[0] > 0 else 0
+        if long_start in seen_starts:
+            continue
+        seen_starts.add(long_start)
         long_end = long_start + len(shorter)
         long_substr = longer[long_start:long_end]
-        m2 = SequenceMatcher(None, shorter, long_substr)
-        r = m2.ratio()
+        r = ratio_to_shorter(long_substr)
         if r > 0.995:
             return 100
         else:
             scores.append(r)
-    return intr(100 * max(scores))
+    score = intr(100 * max(scores))
+    return score if score >= score_cutoff else 0
+
+
+class ScoringContext(object):
+    """
+    A string prepared for scoring.
+
+    Holds the processed string and computes its token list, sorted token
+    string and token set on first use, so that scorers handed the same
+    context (as WRatio() does with its sub-scorers) share that work.
+    """
+    __slots__ = ('processed', '_tokens', '_sorted_string', '_token_set')
+
+    def __init__(self, s, force_ascii=True, do_full_process=True):
+        if do_full_process:
+            s = _full_process(s, force_ascii=force_ascii)
+        self.processed = s
+        self._tokens = None
+        self._sorted_string = None
+        self._token_set = None
+
+    @property
+    def tokens(self):
+        if self._tokens is None:
+            self._tokens = self.processed.split()
+        return self._tokens
+
+    @property
+    def sorted_string(self):
+        if self._sorted_string is None:
+            self._sorted_string = u' '.join(sorted(self.tokens)).strip()
+        return self._sorted_string
+
+    @property
+    def token_set(self):
+        if self._token_set is None:
+            self._token_set = set(self.tokens)
+        return self._token_set
+
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'evictions',
+    'maxsize', 'currsize'])
+
+
+class ContextCache(object):
+    """
+    Least recently used cache of ScoringContexts by (string, type of the
+    string, force_ascii), force_ascii being None for strings used as they
+    are, holding at most maxsize contexts. The type keeps apart values
+    that compare equal but process differently, such as 1.0 and True.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._contexts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, s, force_ascii=True, do_full_process=True):
+        key = s, type(s), bool(force_ascii) if do_full_process else None
+        with self._lock:
+            try:
+                context = self._contexts.get(key)
+            except TypeError:
+                return ScoringContext(s, force_ascii, do_full_process)
+            if context is not None:
+                self.hits += 1
+                self._contexts.move_to_end(key)
+                return context
+            self.misses += 1
+        context = ScoringContext(s, force_ascii, do_full_process)
+        with self._lock:
+            self._contexts[key] = context
+            while len(self._contexts) > self.maxsize:
+                self._contexts.popitem(last=False)
+                self.evictions += 1
+        return context
+
+    def clear(self):
+        with self._lock:
+            self._contexts.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def info(self):
+        return CacheInfo(self.hits, self.misses, self.evictions, self.
+            maxsize, len(self._contexts))
+
+
+_context_cache = None
+
+
+def enable_cache(maxsize=10000):
+    """Cache the processing of strings and their token lists, sorted token
+    strings and token sets, for every scorer and full_process(), keeping
+    the maxsize most recently used strings. Replaces any cache in use.
+
+    The extract functions only cache their queries: the choices of a
+    scan are processed afresh, or once and for all by a ChoiceIndex."""
+    global _context_cache
+    if not isinstance(maxsize, int) or maxsize < 1:
+        raise ValueError(u'maxsize must be a positive integer, not {0!r}'.
+            format(maxsize))
+    _context_cache = ContextCache(maxsize)
+
+
+def disable_cache():
+    """Stop caching, dropping the cache"""
+    global _context_cache
+    _context_cache = None
+
+
+def clear_cache():
+    """Empty the cache and reset its counters"""
+    if _context_cache is not None:
+        _context_cache.clear()
+
+
+def cache_info():
+    """Return the CacheInfo(hits, misses, evictions, maxsize, currsize) of
+    the cache, or None when caching is disabled"""
+    if _context_cache is None:
+        return None
+    return _context_cache.info()
+
+
+def _scoring_context(s, force_ascii=True, do_full_process=True):
+    if _context_cache is not None:
+        return _context_cache.get(s, force_ascii, do_full_process)
+    return ScoringContext(s, force_ascii, do_full_process)
 
 
 def _process_and_sort(s, force_ascii, do_full_process=True):
     """Return a cleaned string with token sorted."""
-    ts = full_process(s, force_ascii=force_ascii) if do_full_process else s
-    tokens = ts.split()
-    sorted_string = u' '.join(sorted(tokens))
-    return sorted_string.strip()
+    return _scoring_context(s, force_ascii, do_full_process).sorted_string
 
 
-@check_for_none
-def _token_sort(s1, s2, partial=True, force_ascii=True, do_full_process=True):
-    sorted1 = _process_and_sort(s1, force_ascii, do_full_process=
-        do_full_process)
-    sorted2 = _process_and_sort(s2, force_ascii, do_full_process=
-        do_full_process)
+def _prefix_score(s1, s2, score_cutoff):
+    """ratio() of s1 to s2, which starts with s1, from their lengths when
+    the similarity backend can tell"""
+    prefix_ratio = similarity_backend.prefix_ratio(len(s1), len(s2))
+    if prefix_ratio is None:
+        return _ratio(s1, s2, score_cutoff)
+    score = intr(100 * prefix_ratio)
+    return score if score >= score_cutoff else 0
+
+
+def _token_sort_contexts(c1, c2, partial=True, score_cutoff=0):
     if partial:
-        return partial_ratio(sorted1, sorted2)
+        return _partial_ratio(c1.sorted_string, c2.sorted_string,
+            score_cutoff=score_cutoff)
+    elif c1.sorted_string == c2.sorted_string and c1.sorted_string:
+        return _prefix_score(c1.sorted_string, c2.sorted_string, score_cutoff)
     else:
-        return ratio(sorted1, sorted2)
+        return _ratio(c1.sorted_string, c2.sorted_string,
+            score_cutoff=score_cutoff)
+
+
+@check_for_none
+def _token_sort(s1, s2, partial=True, force_ascii=True, do_full_process=True,
+    score_cutoff=0):
+    c1 = _scoring_context(s1, force_ascii, do_full_process)
+    c2 = _scoring_context(s2, force_ascii, do_full_process)
+    return _token_sort_contexts(c1, c2, partial=partial, score_cutoff=
+        score_cutoff)
 
 
-def token_sort_ratio(s1, s2, force_ascii=True, do_full_process=True):
+def token_sort_ratio(s1, s2, force_ascii=True, do_full_process=True,
+    score_cutoff=0):
     """Return a measure of the sequences' similarity between 0 and 100
     but sorting the token before comparing.
     """
     return _token_sort(s1, s2, partial=False, force_ascii=force_ascii,
-        do_full_process=do_full_process)
+        do_full_process=do_full_process, score_cutoff=score_cutoff)
 
 
-def partial_token_sort_ratio(s1, s2, force_ascii=True, do_full_process=True):
+def partial_token_sort_ratio(s1, s2, force_ascii=True, do_full_process=True,
+    score_cutoff=0):
     """Return the ratio of the most similar substring as a number between
     0 and 100 but sorting the token before comparing.
     """
     return _token_sort(s1, s2, partial=True, force_ascii=force_ascii,
-        do_full_process=full_process)
+        do_full_process=do_full_process, score_cutoff=score_cutoff)
 
 
-@check_for_none
-def _token_set(s1, s2, partial=True, force_ascii=True, do_full_process=True):
-    """Find all alphanumeric tokens in each string...
-        - treat them as a set
-        - construct two strings of the form:
-            <sorted_intersection><sorted_remainder>
-        - take ratios of those two strings
-        - controls for unordered partial matches"""
-    p1 = full_process(s1, force_ascii=force_ascii) if do_full_process else s1
-    p2 = full_process(s2, force_ascii=force_ascii) if do_full_process else s2
-    if not validate_string(p1):
+def _token_set_contexts(c1, c2, partial=True, score_cutoff=0):
+    if not validate_string(c1.processed):
         return 0
-    if not validate_string(p2):
+    if not validate_string(c2.processed):
         return 0
-    tokens1 = set(p1.split())
-    tokens2 = set(p2.split())
+    tokens1 = c1.token_set
+    tokens2 = c2.token_set
+    if tokens1 and tokens2 and (tokens1 <= tokens2 or tokens2 <= tokens1):
+        return 100
     intersection = tokens1.intersection(tokens2)
+    if partial and intersection:
+        return 100
     diff1to2 = tokens1.difference(tokens2)
     diff2to1 = tokens2.difference(tokens1)
     sorted_sect = ' '.join(sorted(intersection))
     sorted_1to2 = ' '.join(sorted(diff1to2))
     sorted_2to1 = ' '.join(sorted(diff2to1))
+    if partial:
+        return _partial_ratio(sorted_1to2, sorted_2to1, score_cutoff=
+            score_cutoff)
+    if not sorted_sect:
+        return _ratio(sorted_1to2, sorted_2to1, score_cutoff=score_cutoff)
     combined_1to2 = sorted_sect + ' ' + sorted_1to2
     combined_2to1 = sorted_sect + ' ' + sorted_2to1
-    sorted_sect = sorted_sect.strip()
-    combined_1to2 = combined_1to2.strip()
-    combined_2to1 = combined_2to1.strip()
-    if partial:
-        ratio_func = partial_ratio
-    else:
-        ratio_func = ratio
-    pairwise = [ratio_func(sorted_sect, combined_1to2), ratio_func(
-        sorted_sect, combined_2to1), ratio_func(combined_1to2, combined_2to1)]
-    return max(pairwise)
+    best = max(_prefix_score(sorted_sect, combined_1to2, score_cutoff),
+        _prefix_score(sorted_sect, combined_2to1, score_cutoff))
+    if best >= 100:
+        return best
+    return max(best, _ratio(combined_1to2, combined_2to1, score_cutoff=max(
+        score_cutoff, best + 1)))
 
 
-def token_set_ratio(s1, s2, force_ascii=True, do_full_process=True):
+@check_for_none
+def _token_set(s1, s2, partial=True, force_ascii=True, do_full_process=True,
+    score_cutoff=0):
+    """Find all alphanumeric tokens in each string...
+        - treat them as a set
+        - construct two strings of the form:
+            <sorted_intersection><sorted_remainder>
+        - take ratios of those two strings
+        - controls for unordered partial matches"""
+    c1 = _scoring_context(s1, force_ascii, do_full_process)
+    c2 = _scoring_context(s2, force_ascii, do_full_process)
+    return _token_set_contexts(c1, c2, partial=partial, score_cutoff=
+        score_cutoff)
+
+
+def token_set_ratio(s1, s2, force_ascii=True, do_full_process=True,
+    score_cutoff=0):
     return _token_set(s1, s2, partial=False, force_ascii=force_ascii,
-        do_full_process=full_process)
+        do_full_process=do_full_process, score_cutoff=score_cutoff)
 
 
-def partial_token_set_ratio(s1, s2, force_ascii=True, do_full_process=True):
+def partial_token_set_ratio(s1, s2, force_ascii=True, do_full_process=True,
+    score_cutoff=0):
     return _token_set(s1, s2, partial=True, force_ascii=force_ascii,
-        do_full_process=do_full_process)
+        do_full_process=do_full_process, score_cutoff=score_cutoff)
 
 
-def QRatio(s1, s2, force_ascii=True, do_full_process=True):
+def QRatio(s1, s2, force_ascii=True, do_full_process=True, score_cutoff=0):
     """
     Quick ratio comparison between two strings.
 
@@ -250,22 +722,23 @@ def QRatio(s1, s2, force_ascii=True, do_full_process=True):
     :param s2:
     :param force_ascii: Allow only ASCII characters (Default: True)
     :full_process: Process inputs, used here to avoid double processing in extract functions (Default: True)
+    :param score_cutoff: Return 0 for scores below this number, giving up as soon as it is out of reach (Default: 0)
     :return: similarity ratio
     """
-    if do_full_process:
-        p1 = full_process(s1, force_ascii=force_ascii)
-        p2 = full_process(s2, force_ascii=force_ascii)
-    else:
-        p1 = s1
-        p2 = s2
-    if not validate_string(p1):
+    c1 = _scoring_context(s1, force_ascii, do_full_process)
+    c2 = _scoring_context(s2, force_ascii, do_full_process)
+    return _qratio_contexts(c1, c2, score_cutoff=score_cutoff)
+
+
+def _qratio_contexts(c1, c2, score_cutoff=0):
+    if not validate_string(c1.processed):
         return 0
-    if not validate_string(p2):
+    if not validate_string(c2.processed):
         return 0
-    return ratio(p1, p2)
+    return _ratio(c1.processed, c2.processed, score_cutoff=score_cutoff)
 
 
-def UQRatio(s1, s2, do_full_process=True):
+def UQRatio(s1, s2, do_full_process=True, score_cutoff=0):
     """
     Unicode quick ratio
 
@@ -275,10 +748,11 @@ def UQRatio(s1, s2, do_full_process=True):
     :param s2:
     :return: similarity ratio
     """
-    return QRatio(s1, s2, force_ascii=False, do_full_process=do_full_process)
+    return QRatio(s1, s2, force_ascii=False, do_full_process=
+        do_full_process, score_cutoff=score_cutoff)
 
 
-def WRatio(s1, s2, force_ascii=True, do_full_process=True):
+def WRatio(s1, s2, force_ascii=True, do_full_process=True, score_cutoff=0):
     """
     Return a measure of the sequences' similarity between 0 and 100, using different algorithms.
 
@@ -305,19 +779,25 @@ def WRatio(s1, s2, force_ascii=True, do_full_process=True):
     #. Take the highest value from these results
        round it and return it as an integer.
 
+    Every step gets the lowest score that could still reach score_cutoff
+    once scaled, so hopeless comparisons stop as early as possible.
+
     :param s1:
     :param s2:
     :param force_ascii: Allow only ascii characters
     :type force_ascii: bool
     :full_process: Process inputs, used here to avoid double processing in extract functions (Default: True)
+    :param score_cutoff: Return 0 for scores below this number (Default: 0)
     :return:
     """
-    if do_full_process:
-        p1 = full_process(s1, force_ascii=force_ascii)
-        p2 = full_process(s2, force_ascii=force_ascii)
-    else:
-        p1 = s1
-        p2 = s2
+    c1 = _scoring_context(s1, force_ascii, do_full_process)
+    c2 = _scoring_context(s2, force_ascii, do_full_process)
+    return _wratio_contexts(c1, c2, score_cutoff=score_cutoff)
+
+
+def _wratio_contexts(c1, c2, score_cutoff=0):
+    p1 = c1.processed
+    p2 = c2.processed
     if not validate_string(p1):
         return 0
     if not validate_string(p2):
@@ -325,36 +805,496 @@ def WRatio(s1, s2, force_ascii=True, do_full_process=True):
     try_partial = True
     unbase_scale = 0.95
     partial_scale = 0.9
-    base = ratio(p1, p2)
     len_ratio = float(max(len(p1), len(p2))) / min(len(p1), len(p2))
     if len_ratio < 1.5:
         try_partial = False
     if len_ratio > 8:
         partial_scale = 0.6
+    if try_partial and intr(100 * partial_scale) < score_cutoff:
+        return 0
+    base = _ratio(p1, p2, score_cutoff=score_cutoff)
     if try_partial:
-        partial = partial_ratio(p1, p2) * partial_scale
-        ptsor = partial_token_sort_ratio(p1, p2, do_full_process=False
-            ) * unbase_scale * partial_scale
-        ptser = partial_token_set_ratio(p1, p2, do_full_process=False
-            ) * unbase_scale * partial_scale
-        return intr(max(base, partial, ptsor, ptser))
+        partial = _partial_ratio(p1, p2, score_cutoff=_scaled_cutoff(
+            score_cutoff, partial_scale)) * partial_scale
+        token_cutoff = _scaled_cutoff(score_cutoff, unbase_scale *
+            partial_scale)
+        ptsor = _token_sort_contexts(c1, c2, partial=True, score_cutoff=
+            token_cutoff) * unbase_scale * partial_scale
+        ptser = _token_set_contexts(c1, c2, partial=True, score_cutoff=
+            token_cutoff) * unbase_scale * partial_scale
+        score = intr(max(base, partial, ptsor, ptser))
     else:
-        tsor = token_sort_ratio(p1, p2, do_full_process=False) * unbase_scale
-        tser = token_set_ratio(p1, p2, do_full_process=False) * unbase_scale
-        return intr(max(base, tsor, tser))
+        token_cutoff = _scaled_cutoff(score_cutoff, unbase_scale)
+        tsor = _token_sort_contexts(c1, c2, partial=False, score_cutoff=
+            token_cutoff) * unbase_scale
+        tser = _token_set_contexts(c1, c2, partial=False, score_cutoff=
+            token_cutoff) * unbase_scale
+        score = intr(max(base, tsor, tser))
+    return score if score >= score_cutoff else 0
 
 
-def UWRatio(s1, s2, do_full_process=True):
+def UWRatio(s1, s2, do_full_process=True, score_cutoff=0):
     """Return a measure of the sequences' similarity between 0 and 100,
     using different algorithms. Same as WRatio but preserving unicode.
     """
-    return WRatio(s1, s2, force_ascii=False, do_full_process=do_full_process)
+    return WRatio(s1, s2, force_ascii=False, do_full_process=
+        do_full_process, score_cutoff=score_cutoff)
+
+
+def _ratio_contexts(c1, c2, score_cutoff=0):
+    if c1.processed is None or c2.processed is None:
+        return 0
+    return _ratio(c1.processed, c2.processed, score_cutoff=score_cutoff)
+
+
+def _partial_ratio_contexts(c1, c2, score_cutoff=0):
+    if c1.processed is None or c2.processed is None:
+        return 0
+    return _partial_ratio(c1.processed, c2.processed, score_cutoff=
+        score_cutoff)
+
+
+def _ratio_length_band(length, score_cutoff):
+    """Return the shortest and longest length of a string whose ratio() to
+    a string of the given length can reach score_cutoff, from the bound
+    2*min(len1, len2)/(len1 + len2), or None if any length can"""
+    target = (score_cutoff - 0.5) / 200.0
+    if target <= 0:
+        return None
+    if target > 0.5:
+        return 1, 0
+    low = int(math.ceil(target * length / (1 - target) - 1e-09))
+    high = int(math.floor(length * (1 - target) / target + 1e-09))
+    return low, high
+
+
+def _wratio_length_band(length, score_cutoff):
+    """Return the shortest and longest length of a string whose WRatio() to
+    a string of the given length can reach score_cutoff, or None if any
+    length can. Past a length ratio of 1.5 WRatio() scales its partial
+    scores by .9 and past 8 by .6, and its unscaled base score is ratio()."""
+    if score_cutoff > 95:
+        return _ratio_length_band(length, score_cutoff)
+    if score_cutoff > 90:
+        return int(length / 1.5), int(math.ceil(length * 1.5))
+    if score_cutoff > 60:
+        return int(length / 8), length * 8
+    return None
+
+
+class Scorer(object):
+    """
+    A scoring function together with what the extract functions need to
+    know to call it from a tight loop.
+
+    func(s1, s2) is the scorer itself. force_ascii, unless None, is the
+    force_ascii of the full_process() pass func runs on its input unless
+    called with do_full_process=False; the extract functions then process
+    every choice once, up front. score_contexts(c1, c2, score_cutoff),
+    when given, scores two ScoringContexts of processed strings like func
+    and may return 0 as soon as score_cutoff is out of reach. Knowing
+    more about the score lets a ChoiceIndex skip choices: token_based
+    scorers give low scores to strings without a common token (the
+    min_shared_tokens candidates), ratio_bounded ones never exceed
+    ratio() of the processed strings (the q-gram filter), and
+    length_band(length, score_cutoff) returns the shortest and longest
+    processed length a choice can have to reach score_cutoff, or None.
+    Both filters rely on the ratio() bound of lcs_bounded backends and
+    are not used with other backends.
+
+    Scorers are called like func, so a custom scoring function wrapped in
+    one can be passed to every function taking a scorer and is matched
+    like the built-in scorers.
+    """
+    __slots__ = ('func', 'force_ascii', 'score_contexts', 'token_based',
+        'ratio_bounded', 'length_band')
+
+    def __init__(self, func, force_ascii=None, score_contexts=None,
+        token_based=False, ratio_bounded=False, length_band=None):
+        self.func = func
+        self.force_ascii = force_ascii
+        self.score_contexts = score_contexts
+        self.token_based = token_based
+        self.ratio_bounded = ratio_bounded
+        self.length_band = length_band
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def __repr__(self):
+        return 'Scorer({0})'.format(getattr(self.func, '__name__', self.func))
+
+
+_scorers = dict((scorer.func, scorer) for scorer in [Scorer(ratio,
+    score_contexts=_ratio_contexts, ratio_bounded=True, length_band=
+    _ratio_length_band), Scorer(partial_ratio, score_contexts=
+    _partial_ratio_contexts), Scorer(token_sort_ratio, True, partial(
+    _token_sort_contexts, partial=False), token_based=True), Scorer(
+    partial_token_sort_ratio, True, partial(_token_sort_contexts, partial=
+    True), token_based=True), Scorer(token_set_ratio, True, partial(
+    _token_set_contexts, partial=False), token_based=True), Scorer(
+    partial_token_set_ratio, True, partial(_token_set_contexts, partial=
+    True), token_based=True), Scorer(QRatio, True, _qratio_contexts,
+    ratio_bounded=True, length_band=_ratio_length_band), Scorer(UQRatio,
+    False, _qratio_contexts, ratio_bounded=True, length_band=
+    _ratio_length_band), Scorer(WRatio, True, _wratio_contexts,
+    token_based=True, length_band=_wratio_length_band), Scorer(UWRatio,
+    False, _wratio_contexts, token_based=True, length_band=
+    _wratio_length_band)])
+
+
+def _as_scorer(scorer):
+    """Return the Scorer of a scoring function"""
+    if isinstance(scorer, Scorer):
+        return scorer
+    try:
+        return _scorers[scorer]
+    except (KeyError, TypeError):
+        return Scorer(scorer)
 
 
 default_scorer = WRatio
 default_processor = full_process
 
 
+def _no_process(x):
+    return x
+
+
+def _is_empty(choices):
+    try:
+        return choices is None or len(choices) == 0
+    except TypeError:
+        return False
+
+
+def _choice_items(choices):
+    """Return an iterable of (key, choice) pairs and whether choices is a
+    dictionary-like object, whose results carry the key"""
+    try:
+        return choices.items(), True
+    except AttributeError:
+        return ((None, choice) for choice in choices), False
+
+
+def _resolve_processing(processor, scorer):
+    """Return the processor applied to choices and the force_ascii value
+    of the full_process pass built-in scorers get up front, which is None
+    for scorers that do not process their input. Choices are processed
+    without the cache, which a scan over more choices than it holds
+    would only churn."""
+    force_ascii = _as_scorer(scorer).force_ascii
+    if processor is None or force_ascii is not None and processor == (
+        full_process):
+        processor = _no_process
+    elif processor == full_process:
+        processor = _full_process
+    return processor, force_ascii
+
+
+def _pre_processor(force_ascii):
+    if force_ascii is None:
+        return _no_process
+    return partial(_full_process, force_ascii=force_ascii)
+
+
+def _pre_process_all(force_ascii, strings):
+    if force_ascii is None:
+        return list(strings)
+    return full_process_batch(strings, force_ascii)
+
+
+class _ExtractionPlan(object):
+    """
+    Everything the extract functions need to match one query: the
+    processed query, (key, choice, processed) entries in choice order, the
+    scorer with whether it takes a score_cutoff, and, when known, a map
+    from processed text to the position of its first entry. candidates,
+    when set, lists the entries at candidate_positions worth scoring
+    first, and others() returns the positions and entries of the rest,
+    which only need scoring if the candidates fall short.
+    """
+    __slots__ = ('text', 'query', 'entries', 'candidates', 'scorer',
+        'cutoff_aware', 'is_mapping', 'positions', 'candidate_positions',
+        'others')
+
+    def result(self, key, choice, score):
+        if self.is_mapping:
+            return choice, score, key
+        return choice, score
+
+    def position_of_query(self, entries, whole=True):
+        """Return the position of the first entry whose processed form
+        equals the processed query, or None. whole is False for entries
+        that are only part of the choices."""
+        if self.positions is not None and whole:
+            try:
+                return self.positions.get(self.text)
+            except TypeError:
+                pass
+        for position, (_, _, processed) in enumerate(entries):
+            if isinstance(processed, ScoringContext):
+                processed = processed.processed
+            if processed == self.text:
+                return position
+        return None
+
+
+def _prepare_extraction(query, choices, processor, scorer, score_cutoff=0):
+    """Resolve the processors and scorer for matching query against choices.
+
+    Scorers that run full_process themselves get it applied once per
+    string up front and are told not to repeat it. Scorers with a
+    score_contexts entry point are handed ScoringContexts, which a
+    ChoiceIndex prepared for the same processing has stored, along with its
+    token candidates when it has min_shared_tokens set. For ratio_bounded
+    scorers with a score_cutoff, its q-gram index drops the choices that
+    cannot reach it, and otherwise the length band of the scorer does.
+    """
+    plan = _ExtractionPlan()
+    query_processor = _no_process if processor is None else processor
+    processed_query = query_processor(query)
+    if len(processed_query) == 0:
+        logging.warning(
+            u"Applied processor reduces input query to empty string, all comparisons will have score 0. [Query: '{0}']"
+            .format(query))
+    scorer = _as_scorer(scorer)
+    processor, force_ascii = _resolve_processing(processor, scorer)
+    pre_processor = _pre_processor(force_ascii)
+    plan.text = plan.query = pre_processor(processed_query)
+    plan.cutoff_aware = scorer.score_contexts is not None
+    if plan.cutoff_aware:
+        plan.query = _scoring_context(plan.query, do_full_process=False)
+        plan.scorer = scorer.score_contexts
+    elif force_ascii is not None:
+        plan.scorer = partial(scorer.func, do_full_process=False)
+    else:
+        plan.scorer = scorer.func
+    plan.positions = None
+    plan.candidates = None
+    plan.candidate_positions = None
+    plan.others = None
+    prepared = None
+    if isinstance(choices, ChoiceIndex):
+        prepared = choices._prepared.get((processor, force_ascii))
+    if prepared is not None:
+        plan.is_mapping = choices.is_mapping
+        plan.positions = prepared.positions
+        if plan.cutoff_aware:
+            plan.entries = zip(choices.keys, choices.choices, prepared.
+                contexts)
+            if choices.min_shared_tokens and scorer.token_based:
+                plan.candidate_positions = prepared.sharing_tokens(plan.
+                    query.token_set, choices.min_shared_tokens)
+                plan.candidates = choices._entries(prepared, plan.
+                    candidate_positions)
+                plan.others = partial(choices._entries_except, prepared,
+                    plan.candidate_positions)
+            elif (score_cutoff > 0 and scorer.ratio_bounded and
+                similarity_backend.lcs_bounded and isinstance(plan.text, str)):
+                plan.positions = None
+                plan.entries = choices._entries(prepared, prepared.
+                    reaching_ratio(plan.text, score_cutoff))
+            elif (score_cutoff > 0 and scorer.length_band is not None and
+                similarity_backend.lcs_bounded and isinstance(plan.text, str)):
+                band = scorer.length_band(len(plan.text), score_cutoff)
+                if band is not None:
+                    plan.positions = None
+                    plan.entries = choices._entries(prepared, prepared.
+                        within_lengths(band))
+        else:
+            plan.entries = zip(choices.keys, choices.choices, prepared.texts)
+        return plan
+    if isinstance(choices, ChoiceIndex):
+        plan.is_mapping = choices.is_mapping
+        items = zip(choices.keys, choices.choices)
+    else:
+        items, plan.is_mapping = _choice_items(choices)
+    if plan.cutoff_aware:
+        plan.entries = ((key, choice, ScoringContext(pre_processor(
+            processor(choice)), do_full_process=False)) for key, choice in
+            items)
+    else:
+        plan.entries = ((key, choice, pre_processor(processor(choice))) for
+            key, choice in items)
+    return plan
+
+
+def _qgram_counts(s, q=QGRAM_SIZE):
+    return Counter(s[i:i + q] for i in range(len(s) - q + 1))
+
+
+class _PreparedChoices(object):
+    __slots__ = ('contexts', 'texts', 'positions', '_postings',
+        '_qgram_postings', '_lengths', '_sorted_lengths',
+        '_length_positions', '_unsized_positions')
+
+    def __init__(self, texts):
+        self.texts = texts
+        self.contexts = [ScoringContext(text, do_full_process=False) for
+            text in texts]
+        self.positions = {}
+        try:
+            for position, text in enumerate(texts):
+                self.positions.setdefault(text, position)
+        except TypeError:
+            self.positions = None
+        self._postings = None
+        self._qgram_postings = None
+        self._lengths = None
+
+    @property
+    def postings(self):
+        """Inverted index from each token to the positions of the choices
+        containing it, in increasing order"""
+        if self._postings is None:
+            self._postings = {}
+            for position, context in enumerate(self.contexts):
+                for token in context.token_set:
+                    self._postings.setdefault(token, []).append(position)
+        return self._postings
+
+    def sharing_tokens(self, tokens, min_shared):
+        """Return the positions of the choices sharing at least min_shared
+        of tokens, in increasing order"""
+        counts = Counter()
+        for token in tokens:
+            counts.update(self.postings.get(token, ()))
+        return sorted(position for position, count in counts.items() if
+            count >= min_shared)
+
+    def _build_length_index(self):
+        self._lengths = [(len(text) if isinstance(text, str) else
+            None) for text in self.texts]
+        by_length = sorted((length, position) for position, length in
+            enumerate(self._lengths) if length is not None)
+        self._sorted_lengths = [length for length, _ in by_length]
+        self._length_positions = [position for _, position in by_length]
+        self._unsized_positions = [position for position, length in
+            enumerate(self._lengths) if length is None]
+
+    def within_lengths(self, band):
+        """Return the positions, in increasing order, of the choices whose
+        length is within band, a (shortest, longest) pair, and of the
+        choices that are not strings; band None keeps every choice"""
+        if band is None:
+            return range(len(self.texts))
+        if self._lengths is None:
+            self._build_length_index()
+        low, high = band
+        start = bisect.bisect_left(self._sorted_lengths, low)
+        end = bisect.bisect_right(self._sorted_lengths, high)
+        if start >= end:
+            return self._unsized_positions
+        return sorted(self._length_positions[start:end] + self.
+            _unsized_positions)
+
+    def _build_qgram_index(self):
+        self._qgram_postings = {}
+        for position, text in enumerate(self.texts):
+            if isinstance(text, str):
+                for gram, count in _qgram_counts(text).items():
+                    self._qgram_postings.setdefault(gram, []).append((
+                        position, count))
+
+    def reaching_ratio(self, text, score_cutoff):
+        """Return the positions, in increasing order, of the choices whose
+        ratio() to text can reach score_cutoff.
+
+        A rounded score of score_cutoff needs an LCS ratio of at least
+        (score_cutoff - 0.5) / 100, which bounds the indel distance d, and
+        strings of lengths n and m within indel distance d share at least
+        max(n, m) - q + 1 - q * d of their q-grams. Choices below that
+        count are left out, as are those outside the length band of
+        _ratio_length_band(); the rest, and choices that are not strings,
+        are kept.
+        """
+        positions = self.within_lengths(_ratio_length_band(len(text),
+            score_cutoff))
+        if self._qgram_postings is None:
+            self._build_qgram_index()
+        common = {}
+        for gram, count in _qgram_counts(text).items():
+            for position, choice_count in self._qgram_postings.get(gram, ()):
+                common[position] = common.get(position, 0) + min(count,
+                    choice_count)
+        n = len(text)
+        scale = (100.5 - score_cutoff) / 100.0
+        candidates = []
+        for position in positions:
+            m = self._lengths[position]
+            if m is not None:
+                max_distance = int(math.floor((n + m) * scale + 1e-09))
+                needed = max(n, m) - QGRAM_SIZE + 1 - QGRAM_SIZE * max_distance
+                if common.get(position, 0) < needed:
+                    continue
+            candidates.append(position)
+        return candidates
+
+
+class ChoiceIndex(object):
+    """
+    A fixed catalog of choices processed once for repeated queries.
+
+    Pass it to extract(), extractBests(), extractOne() or
+    extractWithoutOrder() in place of the list or dictionary it was built
+    from; results are the same, but the processed choices and their token
+    lists, sorted token strings and token sets are computed only once.
+    The processing depends on the processor and scorer, so the index is
+    prepared for the given pair up front and for others with prepare().
+    Queries using a pair that was never prepared process the choices as
+    they go, exactly as for a plain list.
+
+    With min_shared_tokens set, token-based scorers (the token ratios,
+    WRatio and UWRatio) first score only the choices sharing at least that
+    many tokens with the query, found through an inverted index from token
+    to choices. extract(), extractBests() and extractOne() fall back to
+    scoring every choice when the candidates give fewer results than were
+    asked for, so results only differ when a choice without enough shared
+    tokens would have outscored a candidate, e.g. a misspelt word matched
+    on characters. extractWithoutOrder() always scores every choice.
+
+    :param choices: list or dictionary of choices
+    :param processor: processor the index is prepared for (Default: full_process)
+    :param scorer: scorer the index is prepared for (Default: WRatio)
+    :param min_shared_tokens: tokens a choice must share with the query to
+        be scored first, 0 to score every choice (Default: 0)
+    """
+
+    def __init__(self, choices, processor=default_processor, scorer=
+        default_scorer, min_shared_tokens=0):
+        self.min_shared_tokens = min_shared_tokens
+        items, self.is_mapping = _choice_items(choices)
+        items = list(items)
+        self.keys = [key for key, _ in items]
+        self.choices = [choice for _, choice in items]
+        self._prepared = {}
+        self.prepare(processor, scorer)
+
+    def __len__(self):
+        return len(self.choices)
+
+    def _entries(self, prepared, positions):
+        return [(self.keys[position], self.choices[position], prepared.
+            contexts[position]) for position in positions]
+
+    def _entries_except(self, prepared, positions):
+        """Return the positions missing from positions and their entries"""
+        excluded = set(positions)
+        others = [position for position in range(len(self.choices)) if
+            position not in excluded]
+        return others, self._entries(prepared, others)
+
+    def prepare(self, processor=default_processor, scorer=default_scorer):
+        """Process the choices for queries using processor and scorer"""
+        processor, force_ascii = _resolve_processing(processor, scorer)
+        key = processor, force_ascii
+        if key not in self._prepared:
+            self._prepared[key] = _PreparedChoices(_pre_process_all(
+                force_ascii, [processor(choice) for choice in self.choices]))
+        return self
+
+
 def extractWithoutOrder(query, choices, processor=default_processor, scorer
     =default_scorer, score_cutoff=0):
     """Select the best match in a list or dictionary of choices.
@@ -403,46 +1343,83 @@ def extractWithoutOrder(query, choices, processor=default_processor, scorer
         ('train', 22, 'bard'), ('man', 0, 'dog')
     """
 
-    def no_process(x):
-        return x
-    try:
-        if choices is None or len(choices) == 0:
-            raise StopIteration
-    except TypeError:
-        pass
-    if processor is None:
-        processor = no_process
-    processed_query = processor(query)
-    if len(processed_query) == 0:
-        logging.warning(
-            u"Applied processor reduces input query to empty string, all comparisons will have score 0. [Query: '{0}']"
-            .format(query))
-    if scorer in [WRatio, QRatio, token_set_ratio, token_sort_ratio,
-        partial_token_set_ratio, partial_token_sort_ratio, UWRatio, UQRatio
-        ] and processor == full_process:
-        processor = no_process
-    if scorer in [UWRatio, UQRatio]:
-        pre_processor = partial(full_process, force_ascii=False)
-        scorer = partial(scorer, do_full_process=False)
-    elif scorer in [WRatio, QRatio, token_set_ratio, token_sort_ratio,
-        partial_token_set_ratio, partial_token_sort_ratio]:
-        pre_processor = partial(full_process, force_ascii=True)
-        scorer = partial(scorer, do_full_process=False)
-    else:
-        pre_processor = no_process
-    processed_query = pre_processor(processed_query)
-    try:
-        for key, choice in choices.items():
-            processed = pre_processor(processor(choice))
-            score = scorer(processed_query, processed)
-            if score >= score_cutoff:
-                yield choice, score, key
-    except AttributeError:
-        for choice in choices:
-            processed = pre_processor(processor(choice))
-            score = scorer(processed_query, processed)
-            if score >= score_cutoff:
-                yield choice, score
+    if _is_empty(choices):
+        return
+    plan = _prepare_extraction(query, choices, processor, scorer,
+        score_cutoff)
+    for key, choice, processed in plan.entries:
+        if plan.cutoff_aware:
+            score = plan.scorer(plan.query, processed, score_cutoff=
+                score_cutoff)
+        else:
+            score = plan.scorer(plan.query, processed)
+        if score >= score_cutoff:
+            yield plan.result(key, choice, score)
+
+
+def _extract_top(query, choices, processor, scorer, score_cutoff, limit):
+    """Return the limit best results of extractWithoutOrder(), best first.
+
+    Equal scores keep the order of choices, as heapq.nlargest() would.
+    Once limit results are held, a choice has to beat the lowest of them,
+    so that score is handed to cutoff-aware scorers as a rising
+    score_cutoff and they can reject most choices from cheap bounds.
+    """
+    if limit is None:
+        results = extractWithoutOrder(query, choices, processor, scorer,
+            score_cutoff)
+        return sorted(results, key=lambda i: i[1], reverse=True)
+    if limit <= 0 or _is_empty(choices):
+        return []
+    plan = _prepare_extraction(query, choices, processor, scorer,
+        score_cutoff)
+    if plan.candidates is not None:
+        results = _top_results(plan, plan.candidates, score_cutoff, limit,
+            plan.candidate_positions)
+        if len(results) < limit:
+            positions, entries = plan.others()
+            results = sorted(results + _top_results(plan, entries,
+                score_cutoff, limit, positions), reverse=True)[:limit]
+        return [result for _, _, result in results]
+    return [result for _, _, result in _top_results(plan, plan.entries,
+        score_cutoff, limit)]
+
+
+def _top_results(plan, entries, score_cutoff, limit, indices=None):
+    """Return (score, -index, result) for the limit best entries, best
+    first"""
+    heap = []
+    _push_top(plan, entries, score_cutoff, limit, heap, indices=indices)
+    return sorted(heap, reverse=True)
+
+
+def _push_top(plan, entries, score_cutoff, limit, heap, start=0, indices
+    =None):
+    """Score entries, numbered from start or by the increasing indices,
+    into heap, the min-heap of the limit best (score, -index, result) so
+    far"""
+    cutoff = score_cutoff
+    if len(heap) == limit:
+        cutoff = max(score_cutoff, heap[0][0] + 1)
+    if indices is None:
+        indices = itertools.count(start)
+    for index, (key, choice, processed) in zip(indices, entries):
+        if plan.cutoff_aware:
+            score = plan.scorer(plan.query, processed, score_cutoff=cutoff)
+        else:
+            score = plan.scorer(plan.query, processed)
+        if len(heap) < limit:
+            if score < score_cutoff:
+                continue
+            heapq.heappush(heap, (score, -index, plan.result(key, choice,
+                score)))
+        elif score > heap[0][0]:
+            result = plan.result(key, choice, score)
+            heapq.heapreplace(heap, (score, -index, result))
+        else:
+            continue
+        if len(heap) == limit:
+            cutoff = max(score_cutoff, heap[0][0] + 1)
 
 
 def extract(query, choices, processor=default_processor, scorer=
@@ -491,10 +1468,7 @@ def extract(query, choices, processor=default_processor, scorer=
 
         [('train', 22, 'bard'), ('man', 0, 'dog')]
     """
-    sl = extractWithoutOrder(query, choices, processor, scorer)
-    return heapq.nlargest(limit, sl, key=lambda i: i[1]
-        ) if limit is not None else sorted(sl, key=lambda i: i[1], reverse=True
-        )
+    return _extract_top(query, choices, processor, scorer, 0, limit)
 
 
 def extractBests(query, choices, processor=default_processor, scorer=
@@ -517,11 +1491,62 @@ def extractBests(query, choices, processor=default_processor, scorer=
 
     Returns: A a list of (match, score) tuples.
     """
-    best_list = extractWithoutOrder(query, choices, processor, scorer,
-        score_cutoff)
-    return heapq.nlargest(limit, best_list, key=lambda i: i[1]
-        ) if limit is not None else sorted(best_list, key=lambda i: i[1],
-        reverse=True)
+    return _extract_top(query, choices, processor, scorer, score_cutoff,
+        limit)
+
+
+def extract_many(queries, choices, limit=5, scorer=default_scorer,
+    score_cutoff=0, processor=default_processor, chunk_size=1000):
+    """Get the best matches of several queries in the same choices.
+
+    Returns [extractBests(query, choices, processor, scorer, score_cutoff,
+    limit) for query in queries], but processes every choice once rather
+    than once per query: the choices are taken chunk_size at a time,
+    processed, and scored against all the queries before moving on.
+    A ChoiceIndex is already processed and is searched query by query.
+
+    Args:
+        queries: An iterable of strings to match.
+        choices: A list or dictionary of choices, suitable for use with
+            extract().
+        limit: Optional maximum for the number of elements returned per
+            query. Defaults to 5; None returns every result.
+        scorer: Scoring function for extract().
+        score_cutoff: Optional argument for score threshold. No matches with
+            a score less than this number will be returned. Defaults to 0.
+        processor: Optional function for transforming choices before matching.
+            See extract().
+        chunk_size: Number of choices processed at a time. Defaults to 1000.
+
+    Returns: A list with the list of (match, score) tuples of each query.
+    """
+    queries = list(queries)
+    if isinstance(choices, ChoiceIndex):
+        return [extractBests(query, choices, processor, scorer,
+            score_cutoff, limit) for query in queries]
+    if limit is not None and limit <= 0 or _is_empty(choices):
+        return [[] for _ in queries]
+    items, _ = _choice_items(choices)
+    items = list(items)
+    if limit is None:
+        limit = len(items)
+    plans = [_prepare_extraction(query, choices, processor, scorer,
+        score_cutoff) for query in queries]
+    choice_processor, force_ascii = _resolve_processing(processor, scorer)
+    cutoff_aware = _as_scorer(scorer).score_contexts is not None
+    heaps = [[] for _ in queries]
+    for start in range(0, len(items), chunk_size):
+        chunk = items[start:start + chunk_size]
+        entries = []
+        for (key, choice), processed in zip(chunk, _pre_process_all(
+            force_ascii, [choice_processor(choice) for _, choice in chunk])):
+            if cutoff_aware:
+                processed = ScoringContext(processed, do_full_process=False)
+            entries.append((key, choice, processed))
+        for plan, heap in zip(plans, heaps):
+            _push_top(plan, entries, score_cutoff, limit, heap, start)
+    return [[result for _, _, result in sorted(heap, reverse=True)] for
+        heap in heaps]
 
 
 def extractOne(query, choices, processor=default_processor, scorer=
@@ -545,13 +1570,602 @@ def extractOne(query, choices, processor=default_processor, scorer=
     Returns:
         A tuple containing a single match and its score, if a match
         was found that was above score_cutoff. Otherwise, returns None.
+
+    Ties go to the choice that comes first in choices. Built-in scorers
+    never score above 100, so with them the search stops at the first
+    perfect match. A choice whose processed form equals the processed
+    query is looked up before any scoring; when it scores 100, only the
+    choices before it still need checking for an earlier 100.
     """
-    best_list = extractWithoutOrder(query, choices, processor, scorer,
+    if _is_empty(choices):
+        return None
+    plan = _prepare_extraction(query, choices, processor, scorer,
         score_cutoff)
+    if plan.candidates is not None:
+        best = _best_result(plan, plan.candidates, score_cutoff, False)
+        if best is not None:
+            return best
+        _, entries = plan.others()
+        return _best_result(plan, entries, score_cutoff, False)
+    return _best_result(plan, list(plan.entries), score_cutoff)
+
+
+def _best_result(plan, entries, score_cutoff, whole=True):
+    cutoff_aware = plan.cutoff_aware
+
+    def score_at(index, cutoff):
+        if cutoff_aware:
+            return plan.scorer(plan.query, entries[index][2], score_cutoff=
+                cutoff)
+        return plan.scorer(plan.query, entries[index][2])
+
+    def result(index, score):
+        key, choice, _ = entries[index]
+        return plan.result(key, choice, score)
+    if cutoff_aware and score_cutoff <= 100:
+        hit = plan.position_of_query(entries, whole)
+        if hit is not None and score_at(hit, 100) == 100:
+            for index in range(hit):
+                if score_at(index, 100) == 100:
+                    return result(index, 100)
+            return result(hit, 100)
+    best = None
+    best_score = None
+    cutoff = score_cutoff
+    for index in range(len(entries)):
+        score = score_at(index, cutoff)
+        if score >= score_cutoff and (best is None or score > best_score):
+            best = index
+            best_score = score
+            if cutoff_aware:
+                if score >= 100:
+                    break
+                cutoff = score + 1
+    if best is None:
+        return None
+    return result(best, best_score)
+
+
+class BKTree(object):
+    """
+    Burkhard-Keller tree over processed choices, for finding every choice
+    within an edit distance of a query without comparing it to all of them.
+
+    Each node holds a processed choice and files its children by their
+    distance to it. Since the distance is a metric, a child at distance k
+    from a node at distance d from the query can only hold matches when
+    |d - k| <= max_distance, so whole subtrees are skipped. Choices that
+    process to the same string share a node.
+
+    :param choices: list or dictionary of choices
+    :param processor: function applied to the choices and queries before
+        measuring distances (Default: full_process)
+    :param distance: integer metric on processed strings
+        (Default: indel_distance)
+    """
+
+    def __init__(self, choices, processor=default_processor, distance=
+        indel_distance):
+        self.processor = _no_process if processor is None else processor
+        self.distance = distance
+        items, self.is_mapping = _choice_items(choices)
+        self.keys = []
+        self.choices = []
+        self._root = None
+        for key, choice in items:
+            self._add(self.processor(choice), len(self.choices))
+            self.keys.append(key)
+            self.choices.append(choice)
+
+    def __len__(self):
+        return len(self.choices)
+
+    def _add(self, text, position):
+        if self._root is None:
+            self._root = [text, [position], {}]
+            return
+        node = self._root
+        while True:
+            d = self.distance(text, node[0])
+            if d == 0 and text == node[0]:
+                node[1].append(position)
+                return
+            child = node[2].get(d)
+            if child is None:
+                node[2][d] = [text, [position], {}]
+                return
+            node = child
+
+    def _distance_to(self, text):
+        """Return f(s) -> distance(text, s), with the bit masks of text
+        computed once for the default metric"""
+        length = len(text)
+        if self.distance is indel_distance and 0 < length <= BIT_PARALLEL_MAX_LEN:
+            masks = _pattern_masks(text)
+            return lambda s: length + len(s) - 2 * _lcs_bit_parallel(masks,
+                length, s)
+        return partial(self.distance, text)
+
+    def find(self, query, max_distance):
+        """Return the choices within max_distance of query.
+
+        Results are (choice, distance) tuples, or (choice, distance, key)
+        for a dictionary, nearest first and in choice order for equal
+        distances.
+        """
+        found = []
+        if self._root is None:
+            return found
+        distance_to = self._distance_to(self.processor(query))
+        stack = [self._root]
+        while stack:
+            text, positions, children = stack.pop()
+            d = distance_to(text)
+            if d <= max_distance:
+                found.extend((d, position) for position in positions)
+            for k, child in children.items():
+                if d - max_distance <= k <= d + max_distance:
+                    stack.append(child)
+        found.sort()
+        if self.is_mapping:
+            return [(self.choices[position], d, self.keys[position]) for d,
+                position in found]
+        return [(self.choices[position], d) for d, position in found]
+
+
+def _deletes(s, max_deletes):
+    """Return the set of strings obtained by deleting at most max_deletes
+    characters from s, s included"""
+    found = set([s])
+    layer = found
+    for _ in range(max_deletes):
+        layer = set(t[:i] + t[i + 1:] for t in layer for i in range(len(t)))
+        found |= layer
+    return found
+
+
+def _deletes_bound(length, max_deletes):
+    """Return an upper bound on the size of _deletes() for a string of the
+    given length, without building it"""
+    bound = term = 1
+    for deletes in range(1, max_deletes + 1):
+        term = term * (length - deletes + 1) // deletes
+        bound += term
+    return bound
+
+
+class DeletionIndex(object):
+    """
+    Symmetric delete index for looking up short strings with a few typos.
+
+    Every processed choice is stored under each string it turns into with
+    up to max_distance deletions. Two strings within Levenshtein distance
+    max_distance of each other both reduce to a common string that way,
+    each with at most max_distance deletions, so the choices near a query
+    are found by looking up the query's own deletions, then checked with
+    levenshtein_distance(). Lookups cost a few dictionary probes rather
+    than a pass over the catalog, but the index grows quickly with string
+    length and max_distance: once it would exceed max_entries entries,
+    building stops, a warning is logged and every lookup falls back to
+    extractOne() over all the choices. The size of each choice's
+    deletions is bounded from its length before they are built, so a long
+    choice stops the build without being expanded.
+
+    :param choices: list or dictionary of choices
+    :param processor: function applied to the choices and queries before
+        looking for typos (Default: full_process)
+    :param max_distance: Levenshtein distance covered by the index
+        (Default: 2)
+    :param max_entries: largest number of entries to store (Default: 1000000)
+    """
+
+    def __init__(self, choices, processor=default_processor, max_distance=
+        2, max_entries=1000000):
+        self.processor = processor
+        self.max_distance = max_distance
+        items, self.is_mapping = _choice_items(choices)
+        items = list(items)
+        self.keys = [key for key, _ in items]
+        self.choices = [choice for _, choice in items]
+        self.complete = True
+        self._texts = []
+        self._deletions = {}
+        size = 0
+        text_processor = _no_process if processor is None else processor
+        for position, choice in enumerate(self.choices):
+            text = text_processor(choice)
+            if _deletes_bound(len(text), max_distance) > max_entries:
+                deletions = None
+            else:
+                deletions = _deletes(text, max_distance)
+                size += len(deletions)
+            if deletions is None or size > max_entries:
+                logging.warning(
+                    u'DeletionIndex would exceed {0} entries, lookups will scan every choice'
+                    .format(max_entries))
+                self.complete = False
+                self._deletions = {}
+                break
+            self._texts.append(text)
+            for deletion in deletions:
+                self._deletions.setdefault(deletion, []).append(position)
+
+    def __len__(self):
+        return len(self.choices)
+
+    def within(self, text):
+        """Return the positions, in increasing order, of the choices whose
+        processed form is within max_distance of the processed text"""
+        positions = set()
+        for deletion in _deletes(text, self.max_distance):
+            positions.update(self._deletions.get(deletion, ()))
+        return sorted(position for position in positions if
+            levenshtein_distance(text, self._texts[position]) <= self.
+            max_distance)
+
+    def extractOne(self, query, score_cutoff=0):
+        """Find the best match for query among the choices within
+        max_distance of it.
+
+        Takes and returns the same as extractOne() with WRatio(), but
+        only the choices within the Levenshtein distance are scored. When none
+        of them reaches score_cutoff, or the index is incomplete, every
+        choice is scored as extractOne() would.
+        """
+        if self.complete:
+            text = query if self.processor is None else self.processor(query)
+            positions = self.within(text)
+            if self.is_mapping:
+                candidates = dict((self.keys[position], self.choices[
+                    position]) for position in positions)
+            else:
+                candidates = [self.choices[position] for position in positions
+                    ]
+            best = extractOne(query, candidates, processor=self.processor,
+                scorer=WRatio, score_cutoff=score_cutoff)
+            if best is not None:
+                return best
+        if self.is_mapping:
+            choices = dict(zip(self.keys, self.choices))
+        else:
+            choices = self.choices
+        return extractOne(query, choices, processor=self.processor, scorer=
+            WRatio, score_cutoff=score_cutoff)
+
+
+def _score_chunk(query, choices, processor, scorer, score_cutoff, limit,
+    offset):
+    """Return (score, position) for the limit best of choices, a slice of
+    a larger list starting at offset, best first"""
+    plan = _prepare_extraction(query, choices, processor, scorer,
+        score_cutoff)
+    return [(score, offset - index) for score, index, _ in _top_results(
+        plan, plan.entries, score_cutoff, limit)]
+
+
+def _in_backend(backend, func, *args):
+    """Call func(*args) with backend as the similarity backend, which worker
+    processes do not otherwise share with the process submitting to them"""
+    previous = set_similarity_backend(backend)
+    try:
+        return func(*args)
+    finally:
+        set_similarity_backend(previous)
+
+
+_pickling_errors = pickle.PicklingError, AttributeError, TypeError
+
+
+def _can_parallelize(*arguments):
+    try:
+        pickle.dumps(arguments)
+    except _pickling_errors:
+        return False
+    return True
+
+
+def _chunk_results(futures):
+    """Return the results of futures, or None when sending a task failed
+    to pickle it, cancelling the tasks not started yet"""
+    try:
+        return [future.result() for future in futures]
+    except _pickling_errors:
+        for future in futures:
+            future.cancel()
+        return None
+
+
+def _choice_lists(choices):
+    """Return the keys and the choices of choices as lists, and whether it
+    is dictionary-like"""
+    if isinstance(choices, ChoiceIndex):
+        return choices.keys, choices.choices, choices.is_mapping
+    items, is_mapping = _choice_items(choices)
+    items = list(items)
+    return [key for key, _ in items], [choice for _, choice in items
+        ], is_mapping
+
+
+def _merge_hits(found, limit, keys, values, is_mapping):
+    """Return the results of the limit best (score, position) pairs of
+    found, best first and in choice order for equal scores"""
+    found.sort(key=lambda hit: (-hit[0], hit[1]))
+    results = []
+    for score, position in found[:limit]:
+        if is_mapping:
+            results.append((values[position], score, keys[position]))
+        else:
+            results.append((values[position], score))
+    return results
+
+
+def _extract_parallel(query, choices, processor, scorer, score_cutoff,
+    limit, workers, chunk_size, executor):
+    """Return the limit best results, scoring chunks of choices on a
+    process pool"""
+    keys, values, is_mapping = _choice_lists(choices)
+    if limit is None:
+        limit = len(values)
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    if chunk_size is None:
+        chunk_size = max(1, -(-len(values) // (workers * 4)))
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=workers)
     try:
-        return max(best_list, key=lambda i: i[1])
-    except ValueError:
+        futures = [executor.submit(_in_backend, similarity_backend,
+            _score_chunk, query, values[offset:offset + chunk_size],
+            processor, scorer, score_cutoff, min(limit, chunk_size), offset
+            ) for offset in range(0, len(values), chunk_size)]
+        found = _chunk_results(futures)
+    finally:
+        if own_executor:
+            executor.shutdown()
+    if found is None:
+        return extractBests(query, choices, processor, scorer, score_cutoff,
+            limit)
+    return _merge_hits([hit for hits in found for hit in hits], limit, keys,
+        values, is_mapping)
+
+
+def extract_parallel(query, choices, processor=default_processor, scorer=
+    default_scorer, score_cutoff=0, limit=5, workers=None, chunk_size=None,
+    executor=None):
+    """Return the same as extractBests(), scoring chunks of choices in
+    parallel worker processes.
+
+    Every worker keeps the best limit results of its chunk and the chunks
+    are merged by score, then by position in choices, which reproduces the
+    serial order. The query, choices, processor, scorer and the selected
+    similarity backend are sent to the workers, so they must be picklable:
+    lambdas and other local functions cannot be, and with them the choices
+    are scored here, by extractBests(). Starting
+    processes is costly, so this pays off for large choices, or with a
+    long-lived executor passed in.
+
+    Args:
+        query, choices, processor, scorer, score_cutoff, limit: as for
+            extractBests(); limit None returns every result.
+        workers: Number of worker processes. Defaults to the CPU count.
+        chunk_size: Number of choices per task. Defaults to splitting
+            choices in four tasks per worker.
+        executor: Optional concurrent.futures executor to submit the chunks
+            to instead of a ProcessPoolExecutor started for this call.
+
+    Returns: A list of (match, score) tuples, (match, score, key) for a
+        dictionary.
+    """
+    if limit is not None and limit <= 0 or _is_empty(choices):
+        return []
+    if not _can_parallelize(query, processor, scorer,
+        similarity_backend):
+        return extractBests(query, choices, processor, scorer, score_cutoff,
+            limit)
+    return _extract_parallel(query, choices, processor, scorer,
+        score_cutoff, limit, workers, chunk_size, executor)
+
+
+def extractOne_parallel(query, choices, processor=default_processor,
+    scorer=default_scorer, score_cutoff=0, workers=None, chunk_size=None,
+    executor=None):
+    """Return the same as extractOne(), scoring chunks of choices in
+    parallel worker processes. See extract_parallel()."""
+    if _is_empty(choices):
         return None
+    if not _can_parallelize(query, processor, scorer,
+        similarity_backend):
+        return extractOne(query, choices, processor, scorer, score_cutoff)
+    results = _extract_parallel(query, choices, processor, scorer,
+        score_cutoff, 1, workers, chunk_size, executor)
+    return results[0] if results else None
+
+
+def _score_rows(queries, texts, scorer, score_cutoff, sparse, offset):
+    """Score processed queries against processed texts, returning the rows
+    of the score matrix, or (i, j, score) triples with i counted from
+    offset when sparse"""
+    if scorer.score_contexts is not None:
+        score = partial(scorer.score_contexts, score_cutoff=score_cutoff)
+        queries = [ScoringContext(q, do_full_process=False) for q in queries]
+        texts = [ScoringContext(t, do_full_process=False) for t in texts]
+    elif scorer.force_ascii is not None:
+        score = partial(scorer.func, do_full_process=False)
+    else:
+        score = scorer.func
+    rows = []
+    for i, query in enumerate(queries):
+        row = [score(query, text) for text in texts]
+        row = [(s if s >= score_cutoff else 0) for s in row]
+        if sparse:
+            rows.extend((offset + i, j, s) for j, s in enumerate(row) if s)
+        else:
+            rows.append(row)
+    return rows
+
+
+def cdist(queries, choices, scorer=default_scorer, processor=
+    default_processor, score_cutoff=0, workers=1, sparse=False):
+    """Score every query against every choice.
+
+    Each query and choice is processed once, as extract() would process
+    it, and the built-in scorers then work from shared token contexts.
+
+    Args:
+        queries: A list of strings to match.
+        choices: A list or dictionary of choices, whose values are matched.
+        scorer: Scoring function, as for extract(). Defaults to WRatio().
+        processor: Optional function for transforming queries and choices
+            before matching. See extract().
+        score_cutoff: Scores below this number are reported as 0.
+            Defaults to 0.
+        workers: Number of worker processes the queries are split across.
+            Defaults to 1, scoring in this process, which also happens
+            when the scorer, choices or similarity backend cannot be
+            pickled.
+        sparse: Return a list of (query index, choice index, score)
+            triples for the nonzero scores instead of a matrix.
+
+    Returns:
+        A len(queries) x len(choices) numpy array of scores, or a list of
+        lists if numpy is not installed; with sparse, a list of triples
+        ordered by query, then choice.
+    """
+    query_processor = _no_process if processor is None else processor
+    scorer = _as_scorer(scorer)
+    processor, force_ascii = _resolve_processing(processor, scorer)
+    queries = _pre_process_all(force_ascii, [query_processor(query) for
+        query in queries])
+    items, _ = _choice_items(choices)
+    texts = _pre_process_all(force_ascii, [processor(choice) for _, choice in
+        items])
+    found = None
+    if workers > 1 and queries and _can_parallelize(scorer,
+        similarity_backend):
+        chunk_size = -(-len(queries) // workers)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            found = _chunk_results([executor.submit(_in_backend,
+                similarity_backend, _score_rows, queries[offset:offset +
+                chunk_size], texts, scorer, score_cutoff, sparse, offset) for
+                offset in range(0, len(queries), chunk_size)])
+    if found is None:
+        rows = _score_rows(queries, texts, scorer, score_cutoff, sparse, 0)
+    else:
+        rows = [row for rows in found for row in rows]
+    if sparse or numpy is None:
+        return rows
+    return numpy.array(rows).reshape(len(queries), len(texts))
+
+
+async def _top_results_async(plan, entries, score_cutoff, limit,
+    slice_size, executor, indices=None):
+    """_top_results() scoring slice_size entries at a time, in executor if
+    given, and yielding to the event loop between slices"""
+    loop = asyncio.get_running_loop()
+    heap = []
+    entries = iter(entries)
+    start = 0
+    while True:
+        chunk = list(itertools.islice(entries, slice_size))
+        if not chunk:
+            break
+        chunk_indices = None if indices is None else indices[start:start +
+            len(chunk)]
+        if executor is None:
+            _push_top(plan, chunk, score_cutoff, limit, heap, start,
+                chunk_indices)
+            await asyncio.sleep(0)
+        else:
+            await loop.run_in_executor(executor, _push_top, plan, chunk,
+                score_cutoff, limit, heap, start, chunk_indices)
+        start += len(chunk)
+        if plan.cutoff_aware and len(heap) == limit and heap[0][0] >= 100:
+            break
+    return sorted(heap, reverse=True)
+
+
+async def _extract_top_async(query, choices, processor, scorer,
+    score_cutoff, limit, slice_size, executor):
+    if limit is not None and limit <= 0 or _is_empty(choices):
+        return []
+    if isinstance(executor, ProcessPoolExecutor):
+        if _can_parallelize(query, processor, scorer, similarity_backend):
+            keys, values, is_mapping = _choice_lists(choices)
+            count = len(values) if limit is None else limit
+            loop = asyncio.get_running_loop()
+            futures = [loop.run_in_executor(executor, _in_backend,
+                similarity_backend, _score_chunk, query, values[offset:
+                offset + slice_size], processor, scorer, score_cutoff, min(
+                count, slice_size), offset) for offset in range(0, len(
+                values), slice_size)]
+            try:
+                found = await asyncio.gather(*futures)
+            except _pickling_errors:
+                for future in futures:
+                    future.cancel()
+            else:
+                return _merge_hits([hit for hits in found for hit in hits],
+                    count, keys, values, is_mapping)
+        executor = None
+    plan = _prepare_extraction(query, choices, processor, scorer,
+        score_cutoff)
+    if limit is None:
+        limit = len(choices) if hasattr(choices, '__len__') else math.inf
+    elif plan.candidates is not None:
+        results = await _top_results_async(plan, plan.candidates,
+            score_cutoff, limit, slice_size, executor, plan.
+            candidate_positions)
+        if len(results) < limit:
+            positions, entries = plan.others()
+            results = sorted(results + await _top_results_async(plan,
+                entries, score_cutoff, limit, slice_size, executor,
+                positions), reverse=True)[:limit]
+        return [result for _, _, result in results]
+    results = await _top_results_async(plan, plan.entries, score_cutoff,
+        limit, slice_size, executor)
+    return [result for _, _, result in results]
+
+
+async def extract_async(query, choices, processor=default_processor,
+    scorer=default_scorer, score_cutoff=0, limit=5, slice_size=500,
+    executor=None, timeout=None):
+    """Coroutine returning the same as extractBests(), for asyncio code.
+
+    The choices are scored slice_size at a time and control goes back to
+    the event loop between slices, so a large extraction does not stall
+    other tasks. With an executor, each slice is scored there instead:
+    on a thread pool slice by slice, on a ProcessPoolExecutor all at once
+    in parallel, as extract_parallel() does, unless the query, choices,
+    processor or scorer cannot be pickled. Cancelling the task stops the
+    scoring at the next slice, as does running out of timeout seconds,
+    which raises asyncio.TimeoutError.
+
+    Args:
+        query, choices, processor, scorer, score_cutoff, limit: as for
+            extractBests(); limit None returns every result.
+        slice_size: Number of choices scored between yields. Defaults to
+            500.
+        executor: Optional concurrent.futures executor to score slices in.
+        timeout: Optional number of seconds to give up after.
+
+    Returns: A list of (match, score) tuples, (match, score, key) for a
+        dictionary.
+    """
+    coroutine = _extract_top_async(query, choices, processor, scorer,
+        score_cutoff, limit, slice_size, executor)
+    if timeout is None:
+        return await coroutine
+    return await asyncio.wait_for(coroutine, timeout)
+
+
+async def extractOne_async(query, choices, processor=default_processor,
+    scorer=default_scorer, score_cutoff=0, slice_size=500, executor=None,
+    timeout=None):
+    """Coroutine returning the same as extractOne(), for asyncio code. See
+    extract_async()."""
+    results = await extract_async(query, choices, processor, scorer,
+        score_cutoff, 1, slice_size, executor, timeout)
+    return results[0] if results else None
 
 
 def dedupe(contains_dupes, threshold=70, scorer=token_set_ratio):
@@ -585,14 +2199,24 @@ def dedupe(contains_dupes, threshold=70, scorer=token_set_ratio):
     extractor = []
     for item in contains_dupes:
         matches = extract(item, contains_dupes, limit=None, scorer=scorer)
-        filtered = [x for x in matches if x[1] > threshold]
-        if len(filtered) == 1:
-            extractor.append(filtered[0][0])
-        else:
-            filtered = sorted(filtered, key=lambda x: x[0])
-            filter_sort = sorted(filtered, key=lambda x: len(x[0]), reverse
-                =True)
-            extractor.append(filter_sort[0][0])
+        extractor.append(_canonical_match(matches, threshold))
+    return _deduped(extractor, contains_dupes)
+
+
+def _canonical_match(matches, threshold):
+    """Return the longest of the matches scoring above threshold, the
+    first alphabetically among equally long ones"""
+    filtered = [x[0] for x in matches if x[1] > threshold]
+    if len(filtered) == 1:
+        return filtered[0]
+    return _canonical(filtered)
+
+
+def _canonical(strings):
+    return sorted(sorted(strings), key=len, reverse=True)[0]
+
+
+def _deduped(extractor, contains_dupes):
     keys = {}
     for e in extractor:
         keys[e] = 1
@@ -601,3 +2225,177 @@ def dedupe(contains_dupes, threshold=70, scorer=token_set_ratio):
         return contains_dupes
     else:
         return extractor
+
+
+_MERSENNE_PRIME = (1 << 61) - 1
+
+
+def _minhash_coefficients(count, seed):
+    rng = random.Random(seed)
+    return [(rng.randint(1, _MERSENNE_PRIME - 1), rng.randint(0,
+        _MERSENNE_PRIME - 1)) for _ in range(count)]
+
+
+def _minhash_signature(tokens, coefficients):
+    """Return the MinHash signature of a set of tokens, one minimum per
+    (a, b) pair of coefficients of the hash (a * crc32(token) + b) mod p"""
+    hashes = [zlib.crc32(token.encode('utf-8')) & 4294967295 for token in
+        tokens]
+    return [min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in
+        coefficients]
+
+
+def lsh_dedupe(contains_dupes, threshold=70, scorer=token_set_ratio, bands=
+    16, rows=2, seed=0):
+    """Remove duplicates like dedupe(), scoring only the pairs of strings
+    that MinHash locality sensitive hashing puts in a common bucket.
+
+    Each string gets a MinHash signature of bands * rows values over the
+    tokens of its processed form, and the signature is cut into bands of
+    rows values. Strings agreeing on a whole band become candidates, so
+    two strings whose token sets have Jaccard similarity J are compared
+    with probability 1 - (1 - J ** rows) ** bands. Every string is
+    compared with its candidates as dedupe() compares it with all the
+    strings, and the same longest-then-alphabetical string is kept.
+
+    This is approximate: duplicates with few tokens in common, e.g.
+    misspelt single words, can miss each other and both be kept. More
+    bands or fewer rows find more of them at the cost of more
+    comparisons. The hashes are built from crc32 and seed, so results
+    are the same from run to run.
+
+    Args:
+        contains_dupes: A list of strings that we would like to dedupe.
+        threshold: the numerical value (0,100) point at which we expect to find duplicates.
+            Defaults to 70 out of 100
+        scorer: Optional function for scoring matches, as for dedupe().
+            Defaults to token_set_ratio().
+        bands: Number of bands of the signature. Defaults to 16.
+        rows: Number of signature values per band. Defaults to 2.
+        seed: Seed of the hash functions. Defaults to 0.
+
+    Returns:
+        A deduplicated list, as returned by dedupe().
+    """
+    buckets, item_buckets = _lsh_buckets(contains_dupes, bands, rows, seed)
+    extractor = []
+    for position, item in enumerate(contains_dupes):
+        candidates = set([position])
+        for key in item_buckets[position]:
+            candidates.update(buckets[key])
+        candidates = [contains_dupes[candidate] for candidate in sorted(
+            candidates)]
+        matches = extract(item, candidates, limit=None, scorer=scorer)
+        extractor.append(_canonical_match(matches, threshold))
+    return _deduped(extractor, contains_dupes)
+
+
+def _lsh_buckets(contains_dupes, bands, rows, seed):
+    """Return the LSH buckets, as lists of positions by bucket key, and
+    the keys of the buckets of each string"""
+    coefficients = _minhash_coefficients(bands * rows, seed)
+    buckets = {}
+    item_buckets = []
+    for position, item in enumerate(contains_dupes):
+        tokens = set(full_process(item).split())
+        keys = []
+        if tokens:
+            signature = _minhash_signature(tokens, coefficients)
+            for band in range(bands):
+                key = band, tuple(signature[band * rows:(band + 1) * rows])
+                buckets.setdefault(key, []).append(position)
+                keys.append(key)
+        item_buckets.append(keys)
+    return buckets, item_buckets
+
+
+def lsh_candidate_pairs(contains_dupes, bands=16, rows=2, seed=0):
+    """Generate the (i, j) position pairs, i < j, of the strings that
+    lsh_dedupe() would compare, for cluster_dedupe(). A pair sharing
+    several buckets is generated once per bucket."""
+    buckets, _ = _lsh_buckets(contains_dupes, bands, rows, seed)
+    for positions in buckets.values():
+        for index, i in enumerate(positions):
+            for j in positions[index + 1:]:
+                yield i, j
+
+
+def _pair_scorer(strings, scorer):
+    """Return f(i, j, score_cutoff) -> score of strings[i] against
+    strings[j], processing each string once as extract() would"""
+    processor, force_ascii = _resolve_processing(default_processor, scorer)
+    processed = _pre_process_all(force_ascii, [processor(s) for s in strings])
+    scorer = _as_scorer(scorer)
+    if scorer.score_contexts is not None:
+        contexts = [ScoringContext(p, do_full_process=False) for p in
+            processed]
+        context_scorer = scorer.score_contexts
+        return lambda i, j, score_cutoff: context_scorer(contexts[i],
+            contexts[j], score_cutoff=score_cutoff)
+    func = scorer.func
+    if force_ascii is not None:
+        func = partial(func, do_full_process=False)
+    return lambda i, j, score_cutoff: func(processed[i], processed[j])
+
+
+def cluster_dedupe(contains_dupes, threshold=70, scorer=token_set_ratio,
+    candidate_pairs=None):
+    """Remove duplicates by clustering strings that score above threshold.
+
+    Unlike dedupe(), which keeps for every string the best of its own
+    matches, duplicates are transitive here: strings are merged with
+    union-find into clusters connected by scores above threshold, and
+    each cluster keeps its longest string, the first alphabetically among
+    equally long ones. Every unordered pair is scored at most once, as
+    scorer(earlier string, later string), so asymmetric scorers are only
+    asked one way round.
+
+    Args:
+        contains_dupes: A list of strings that we would like to dedupe.
+        threshold: the numerical value (0,100) point at which we expect to find duplicates.
+            Defaults to 70 out of 100
+        scorer: Optional function for scoring matches, as for dedupe().
+            Defaults to token_set_ratio().
+        candidate_pairs: Optional iterable of (i, j) position pairs, the
+            only pairs scored, e.g. lsh_candidate_pairs(contains_dupes).
+            Defaults to every pair.
+
+    Returns:
+        A (deduplicated list, clusters) tuple. The list is contains_dupes
+        itself if nothing was merged, and the clusters are lists of the
+        strings merged together, both in order of first appearance.
+    """
+    parents = list(range(len(contains_dupes)))
+
+    def root(i):
+        while parents[i] != i:
+            parents[i] = parents[parents[i]]
+            i = parents[i]
+        return i
+    if candidate_pairs is None:
+        candidate_pairs = ((i, j) for i in range(len(contains_dupes)) for j in
+            range(i + 1, len(contains_dupes)))
+        seen = None
+    else:
+        seen = set()
+    score = _pair_scorer(contains_dupes, scorer)
+    for i, j in candidate_pairs:
+        pair = (i, j) if i < j else (j, i)
+        if seen is not None:
+            if i == j or pair in seen:
+                continue
+            seen.add(pair)
+        if score(pair[0], pair[1], threshold) > threshold:
+            i, j = root(i), root(j)
+            if i != j:
+                parents[max(i, j)] = min(i, j)
+    members = {}
+    for position, item in enumerate(contains_dupes):
+        members.setdefault(root(position), []).append(item)
+    clusters = [members[position] for position in sorted(members)]
+    deduped = {}
+    for cluster in clusters:
+        deduped[_canonical(cluster)] = 1
+    if len(deduped) == len(contains_dupes):
+        return contains_dupes, clusters
+    return list(deduped), clusters
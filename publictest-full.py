@@ -2,7 +2,10 @@
 from __future__ import unicode_literals
 import unittest
 import re
+import pickle
 import sys
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 import pycodestyle
 
 import fuzzywuzzy 
@@ -37,6 +40,17 @@ class StringProcessingTest(unittest.TestCase):
         p2 = fuzzywuzzy.StringProcessor.replace_non_letters_non_numbers_with_whitespace(s2)
         self.assertNotEqual(p1, p2)
 
+    def test_full_process_batch(self):
+        strings = ["New York Mets - Atlanta Braves", "  CÃ£es danados ", "", "Ã‡a va?", "a\x00b",
+                   "ΟΔΟΣ", "ΟΔΟΣ ΑΘΗΝΑΣ", "İstanbul", "\tmets\n"]
+        for force_ascii in (False, True):
+            expected = [fuzzywuzzy.full_process(s, force_ascii) for s in strings]
+            self.assertEqual(fuzzywuzzy.full_process_batch(strings, force_ascii), expected)
+            self.assertEqual(fuzzywuzzy.full_process_batch(strings[:4], force_ascii), expected[:4])
+            self.assertEqual(fuzzywuzzy.full_process_batch(strings[4:], force_ascii), expected[4:])
+        self.assertEqual(fuzzywuzzy.full_process_batch([None, 42, "Mets!"], True), ["", "42", "mets"])
+        self.assertEqual(fuzzywuzzy.full_process_batch([]), [])
+
 
 class est(unittest.TestCase):
     def setUp(self):
@@ -70,6 +84,14 @@ class est(unittest.TestCase):
             s = fuzzywuzzy.asciidammit(s)
             fuzzywuzzy.asciionly(s)
 
+    def test_asciidammit_keeps_ascii_and_code_points_above_latin1(self):
+        self.assertEqual(fuzzywuzzy.asciidammit(self.mixed_strings[0]), self.mixed_strings[0])
+        self.assertEqual(fuzzywuzzy.asciidammit("a\xac\u1234\u20ac\U00008000"), "a\u1234\u20ac\U00008000")
+        self.assertEqual(fuzzywuzzy.asciidammit("CÃ£es danados"), "Ces danados")
+        self.assertEqual(fuzzywuzzy.asciidammit(42), "42")
+        self.assertEqual(self.mixed_strings[4].translate(fuzzywuzzy.translation_table),
+                         fuzzywuzzy.asciidammit(self.mixed_strings[4]))
+
     def test_fullProcess(self):
         for s in self.mixed_strings:
             fuzzywuzzy.full_process(s)
@@ -166,6 +188,16 @@ class RatioTest(unittest.TestCase):
         self.assertEqual(fuzzywuzzy.ratio("", ""), 0)
         self.assertEqual(fuzzywuzzy.partial_ratio("", ""), 0)
 
+    def testPartialRatioContainedInLongString(self):
+        longer = " ".join(self.cirque_strings * 5)
+        self.assertEqual(fuzzywuzzy.partial_ratio("zarkana las vegas", longer), 100)
+        self.assertEqual(fuzzywuzzy.partial_ratio(longer, "bellagio"), 100)
+
+    def testPartialTokenSetRatioSubset(self):
+        self.assertEqual(fuzzywuzzy.partial_token_set_ratio("vegas cirque", self.cirque_strings[0]), 100)
+        self.assertEqual(fuzzywuzzy.token_set_ratio("vegas cirque", self.cirque_strings[0]), 100)
+        self.assertNotEqual(fuzzywuzzy.token_set_ratio("vegas cirques", self.cirque_strings[0]), 100)
+
     def testIssueSeven(self):
         s1 = "HSINCHUANG"
         s2 = "SINJHUAN"
@@ -498,6 +530,111 @@ class ProcessTest(unittest.TestCase):
         result = fuzzywuzzy.dedupe(contains_dupes)
         self.assertEqual(result, deduped_list)
 
+    def test_lsh_dedupe(self):
+        contains_dupes = ['Frodo Baggins', 'Tom Sawyer', 'Bilbo Baggin', 'Samuel L. Jackson', 'F. Baggins',
+                          'Frody Baggins', 'Bilbo Baggins']
+        result = fuzzywuzzy.lsh_dedupe(contains_dupes)
+        self.assertEqual(list(result), list(fuzzywuzzy.dedupe(contains_dupes)))
+        self.assertEqual(list(fuzzywuzzy.lsh_dedupe(contains_dupes, seed=3)), list(result))
+
+        contains_dupes = ['Tom', 'Dick', 'Harry']
+        self.assertEqual(fuzzywuzzy.lsh_dedupe(contains_dupes), contains_dupes)
+
+    def test_lsh_dedupe_only_compares_candidates(self):
+        # no token in common, so never compared, though token_set_ratio scores them 89
+        contains_dupes = ['Baggins', 'Bagginses']
+        self.assertEqual(len(fuzzywuzzy.dedupe(contains_dupes)), 1)
+        self.assertEqual(fuzzywuzzy.lsh_dedupe(contains_dupes), contains_dupes)
+
+    def test_cluster_dedupe(self):
+        contains_dupes = ['Frodo Baggins', 'Tom Sawyer', 'Bilbo Baggin', 'Samuel L. Jackson', 'F. Baggins',
+                          'Frody Baggins', 'Bilbo Baggins']
+        deduped, clusters = fuzzywuzzy.cluster_dedupe(contains_dupes)
+        self.assertEqual(deduped, ['Bilbo Baggins', 'Tom Sawyer', 'Samuel L. Jackson'])
+        self.assertEqual(clusters, [['Frodo Baggins', 'Bilbo Baggin', 'F. Baggins', 'Frody Baggins', 'Bilbo Baggins'],
+                                    ['Tom Sawyer'], ['Samuel L. Jackson']])
+
+        contains_dupes = ['Tom', 'Dick', 'Harry']
+        deduped, clusters = fuzzywuzzy.cluster_dedupe(contains_dupes)
+        self.assertTrue(deduped is contains_dupes)
+        self.assertEqual(clusters, [['Tom'], ['Dick'], ['Harry']])
+
+    def test_cluster_dedupe_scores_each_pair_once(self):
+        calls = []
+
+        def scorer(s1, s2):
+            calls.append((s1, s2))
+            return 100 if s1[0] == s2[0] else 0
+        contains_dupes = ['ab', 'ac', 'bd', 'ae']
+        deduped, clusters = fuzzywuzzy.cluster_dedupe(contains_dupes, scorer=scorer)
+        self.assertEqual(len(calls), 6)
+        self.assertEqual(deduped, ['ab', 'bd'])
+        self.assertEqual(clusters, [['ab', 'ac', 'ae'], ['bd']])
+
+        del calls[:]
+        fuzzywuzzy.cluster_dedupe(contains_dupes, scorer=scorer, candidate_pairs=[(0, 1), (1, 0), (3, 1), (1, 1)])
+        self.assertEqual(calls, [('ab', 'ac'), ('ac', 'ae')])
+
+    def test_cluster_dedupe_lsh_candidates(self):
+        contains_dupes = ['Frodo Baggin', 'Frodo Baggins', 'F. Baggins', 'Samwise G.', 'Gandalf', 'Bilbo Baggins']
+        self.assertEqual(
+            fuzzywuzzy.cluster_dedupe(contains_dupes, candidate_pairs=fuzzywuzzy.lsh_candidate_pairs(contains_dupes)),
+            fuzzywuzzy.cluster_dedupe(contains_dupes))
+
+    def test_extract_matches_full_sort(self):
+        choices = self.baseball_strings + self.cirque_strings + self.baseball_strings
+        query = "new york mets at chicago cubs"
+        for scorer in (fuzzywuzzy.WRatio, fuzzywuzzy.ratio, fuzzywuzzy.token_set_ratio):
+            everything = list(fuzzywuzzy.extractWithoutOrder(query, choices, scorer=scorer))
+            for limit in (1, 2, 5, len(choices)):
+                expected = sorted(everything, key=lambda i: i[1], reverse=True)[:limit]
+                self.assertEqual(fuzzywuzzy.extract(query, choices, scorer=scorer, limit=limit), expected)
+                expected = [r for r in expected if r[1] >= 40]
+                self.assertEqual(fuzzywuzzy.extractBests(query, choices, scorer=scorer, limit=limit,
+                                                         score_cutoff=40), expected)
+
+    def test_extract_ties_keep_choice_order(self):
+        choices = {1: "braves vs mets", 2: "mets vs braves", 3: "braves vs mets", 4: "braves"}
+        result = fuzzywuzzy.extract("braves vs mets", choices, scorer=fuzzywuzzy.token_sort_ratio, limit=2)
+        self.assertEqual(result, [("braves vs mets", 100, 1), ("mets vs braves", 100, 2)])
+
+    def test_extract_empty_choices(self):
+        self.assertEqual(list(fuzzywuzzy.extractWithoutOrder("mets", [])), [])
+        self.assertEqual(fuzzywuzzy.extract("mets", []), [])
+        self.assertEqual(fuzzywuzzy.extract("mets", self.baseball_strings, limit=0), [])
+
+    def test_extractOne_perfect_match_tie_breaking(self):
+        choices = ["braves vs mets", "New York Mets!", "the new york mets", "new york mets"]
+        self.assertEqual(fuzzywuzzy.extractOne("new york mets", choices), ("New York Mets!", 100))
+        best = fuzzywuzzy.extractOne("new york mets", choices, scorer=fuzzywuzzy.partial_ratio)
+        self.assertEqual(best, ("New York Mets!", 100))
+        best = fuzzywuzzy.extractOne("new york mets", choices, scorer=fuzzywuzzy.partial_ratio, processor=None)
+        self.assertEqual(best, ("the new york mets", 100))
+        best = fuzzywuzzy.extractOne("new york mets", dict(enumerate(choices)), scorer=fuzzywuzzy.partial_ratio,
+                                     processor=None)
+        self.assertEqual(best, ("the new york mets", 100, 2))
+
+    def test_extract_many(self):
+        choices = self.baseball_strings + self.cirque_strings + ["new york mets", ""]
+        queries = ["new york mets", "zarkana las vegas", "braves vs mets", ""]
+        for scorer in [fuzzywuzzy.WRatio, fuzzywuzzy.ratio, fuzzywuzzy.token_set_ratio]:
+            for limit in [1, 3, None]:
+                for chunk_size in [2, 1000]:
+                    self.assertEqual(
+                        fuzzywuzzy.extract_many(queries, choices, limit=limit, scorer=scorer, chunk_size=chunk_size),
+                        [fuzzywuzzy.extractBests(query, choices, scorer=scorer, limit=limit) for query in queries])
+        mapping = dict(enumerate(choices))
+        self.assertEqual(fuzzywuzzy.extract_many(queries, mapping, score_cutoff=80, chunk_size=3),
+                         [fuzzywuzzy.extractBests(query, mapping, score_cutoff=80) for query in queries])
+        self.assertEqual(fuzzywuzzy.extract_many(queries, [], limit=3), [[], [], [], []])
+
+    def test_extractOne_first_of_equal_scores(self):
+        choices = ["mets vs braves", "braves vs mets", "braves vs mets"]
+        best = fuzzywuzzy.extractOne("mets braves", choices, scorer=fuzzywuzzy.token_set_ratio)
+        self.assertEqual(best, ("mets vs braves", 100))
+        best = fuzzywuzzy.extractOne("braves vs metz", choices, scorer=fuzzywuzzy.ratio)
+        self.assertEqual(best, ("braves vs mets", 93))
+
     def test_simplematch(self):
         basic_string = 'a, b'
         match_strings = ['a, b']
@@ -509,6 +646,728 @@ class ProcessTest(unittest.TestCase):
         self.assertEqual(part_result, ('a, b', 100))
 
 
+class ScoringContextTest(unittest.TestCase):
+
+    def testDerivedTokens(self):
+        context = fuzzywuzzy.ScoringContext("New York Mets - Atlanta Braves")
+        self.assertEqual(context.processed, "new york mets   atlanta braves")
+        self.assertEqual(context.tokens, ["new", "york", "mets", "atlanta", "braves"])
+        self.assertEqual(context.sorted_string, "atlanta braves mets new york")
+        self.assertEqual(context.token_set, set(["new", "york", "mets", "atlanta", "braves"]))
+        self.assertTrue(context.tokens is context.tokens)
+
+    def testUnprocessed(self):
+        context = fuzzywuzzy.ScoringContext("New York", do_full_process=False)
+        self.assertEqual(context.sorted_string, "New York")
+
+    def testDoFullProcessHonoured(self):
+        self.assertEqual(fuzzywuzzy.partial_token_sort_ratio("New York", "new york"), 100)
+        self.assertNotEqual(fuzzywuzzy.partial_token_sort_ratio("New York", "new york", do_full_process=False), 100)
+        self.assertNotEqual(fuzzywuzzy.token_set_ratio("New York", "new york", do_full_process=False), 100)
+
+    def testUWRatioKeepsUnicodeTokens(self):
+        s1 = "псих олог"
+        s2 = "олог псих"
+        self.assertEqual(fuzzywuzzy.UWRatio(s1, s2), 95)
+
+
+class ScoreCutoffTest(unittest.TestCase):
+
+    def setUp(self):
+        self.strings = [
+            "new york mets", "new YORK mets", "the wonderful new york mets",
+            "new york mets vs atlanta braves", "atlanta braves vs new york mets",
+            "cirque du soleil - zarkana - las vegas", "zarakana - cirque du soleil - bellagio",
+            "zarkana las vegas", "braves vs mets", "HSINCHUANG", "SINJHUAN",
+        ]
+        self.scorers = [
+            fuzzywuzzy.ratio, fuzzywuzzy.partial_ratio, fuzzywuzzy.token_sort_ratio,
+            fuzzywuzzy.partial_token_sort_ratio, fuzzywuzzy.token_set_ratio,
+            fuzzywuzzy.partial_token_set_ratio, fuzzywuzzy.QRatio, fuzzywuzzy.UQRatio,
+            fuzzywuzzy.WRatio, fuzzywuzzy.UWRatio,
+        ]
+
+    def testCutoffOnlyZeroesLowScores(self):
+        for scorer in self.scorers:
+            for s1 in self.strings:
+                for s2 in self.strings:
+                    score = scorer(s1, s2)
+                    for cutoff in (1, 50, 60, 61, 85, 90, 91, 100):
+                        expected = score if score >= cutoff else 0
+                        self.assertEqual(scorer(s1, s2, score_cutoff=cutoff), expected)
+
+    def testLengthBound(self):
+        self.assertEqual(fuzzywuzzy.ratio("mets", "new york mets vs atlanta braves", score_cutoff=50), 0)
+        longer = "new york mets vs atlanta braves vs chicago cubs"
+        self.assertEqual(fuzzywuzzy.WRatio("mets", longer, score_cutoff=61), 0)
+        self.assertEqual(fuzzywuzzy.WRatio("mets", longer, score_cutoff=60), 60)
+
+
+class ChoiceIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.choices = [
+            "new york mets", "New York Mets!", "the wonderful new york mets",
+            "new york mets vs atlanta braves", "atlanta braves vs new york mets",
+            "cirque du soleil - zarkana - las vegas", "zarkana las vegas", "braves vs mets",
+        ]
+        self.scorers = [
+            fuzzywuzzy.ratio, fuzzywuzzy.partial_ratio, fuzzywuzzy.token_sort_ratio,
+            fuzzywuzzy.partial_token_sort_ratio, fuzzywuzzy.token_set_ratio,
+            fuzzywuzzy.partial_token_set_ratio, fuzzywuzzy.QRatio, fuzzywuzzy.UQRatio,
+            fuzzywuzzy.WRatio, fuzzywuzzy.UWRatio,
+        ]
+        self.queries = ["new york mets", "NEW YORK METS", "braves mets", "las vegas", "xyz"]
+
+    def assertSameResults(self, choices, index, **kwargs):
+        for query in self.queries:
+            self.assertEqual(fuzzywuzzy.extract(query, index, **kwargs),
+                             fuzzywuzzy.extract(query, choices, **kwargs))
+            self.assertEqual(fuzzywuzzy.extractBests(query, index, score_cutoff=60, limit=3, **kwargs),
+                             fuzzywuzzy.extractBests(query, choices, score_cutoff=60, limit=3, **kwargs))
+            self.assertEqual(fuzzywuzzy.extractOne(query, index, **kwargs),
+                             fuzzywuzzy.extractOne(query, choices, **kwargs))
+            self.assertEqual(list(fuzzywuzzy.extractWithoutOrder(query, index, **kwargs)),
+                             list(fuzzywuzzy.extractWithoutOrder(query, choices, **kwargs)))
+
+    def testPreparedScorers(self):
+        for scorer in self.scorers:
+            index = fuzzywuzzy.ChoiceIndex(self.choices, scorer=scorer)
+            self.assertSameResults(self.choices, index, scorer=scorer)
+
+    def testUnpreparedScorer(self):
+        index = fuzzywuzzy.ChoiceIndex(self.choices, scorer=fuzzywuzzy.ratio)
+        self.assertSameResults(self.choices, index, scorer=fuzzywuzzy.WRatio)
+        self.assertSameResults(self.choices, index, scorer=fuzzywuzzy.partial_ratio, processor=None)
+
+    def testPrepare(self):
+        index = fuzzywuzzy.ChoiceIndex(self.choices)
+        self.assertTrue(index.prepare(processor=None, scorer=fuzzywuzzy.ratio) is index)
+        self.assertSameResults(self.choices, index, scorer=fuzzywuzzy.ratio, processor=None)
+
+    def testCustomScorerAndProcessor(self):
+        def scorer(query, choice):
+            return -abs(len(query) - len(choice))
+        index = fuzzywuzzy.ChoiceIndex(self.choices, processor=lambda s: s[:8], scorer=scorer)
+        self.assertSameResults(self.choices, index, scorer=scorer)
+
+    def testDictionary(self):
+        choices = dict(enumerate(self.choices))
+        index = fuzzywuzzy.ChoiceIndex(choices)
+        self.assertEqual(len(index), len(self.choices))
+        self.assertSameResults(choices, index)
+        self.assertEqual(fuzzywuzzy.extractOne("zarkana las vegas", index, scorer=fuzzywuzzy.ratio),
+                         ("zarkana las vegas", 100, 6))
+
+    def testEmpty(self):
+        index = fuzzywuzzy.ChoiceIndex([])
+        self.assertEqual(fuzzywuzzy.extract("mets", index), [])
+        self.assertEqual(fuzzywuzzy.extractOne("mets", index), None)
+
+    def testExactMatch(self):
+        self.assertEqual(fuzzywuzzy.extractOne("New York Mets", fuzzywuzzy.ChoiceIndex(self.choices)),
+                         ("new york mets", 100))
+
+    def testSharedTokenCandidates(self):
+        index = fuzzywuzzy.ChoiceIndex(self.choices, min_shared_tokens=1)
+        for scorer in [fuzzywuzzy.token_set_ratio, fuzzywuzzy.token_sort_ratio, fuzzywuzzy.WRatio]:
+            for query in self.queries:
+                self.assertEqual(fuzzywuzzy.extractOne(query, index, scorer=scorer),
+                                 fuzzywuzzy.extractOne(query, self.choices, scorer=scorer))
+                self.assertEqual(fuzzywuzzy.extractBests(query, index, scorer=scorer, score_cutoff=60, limit=2),
+                                 fuzzywuzzy.extractBests(query, self.choices, scorer=scorer, score_cutoff=60, limit=2))
+        index = fuzzywuzzy.ChoiceIndex(self.choices, min_shared_tokens=2)
+        self.assertEqual(fuzzywuzzy.extract("mets braves", index, limit=2),
+                         [("braves vs mets", 95), ("new york mets vs atlanta braves", 86)])
+        self.assertEqual(fuzzywuzzy.extract("mets braves", self.choices, limit=2),
+                         [("braves vs mets", 95), ("the wonderful new york mets", 86)])
+
+    def testSharedTokenFallbackScoresEachChoiceOnce(self):
+        scored = []
+        score_contexts = fuzzywuzzy._as_scorer(fuzzywuzzy.token_set_ratio).score_contexts
+
+        def counted(c1, c2, score_cutoff=0):
+            scored.append(c2)
+            return score_contexts(c1, c2, score_cutoff=score_cutoff)
+        scorer = fuzzywuzzy.Scorer(fuzzywuzzy.token_set_ratio, True, counted, token_based=True)
+        index = fuzzywuzzy.ChoiceIndex(self.choices, min_shared_tokens=1)
+        for query in self.queries:
+            for cutoff in [0, 60, 90, 101]:
+                del scored[:]
+                self.assertEqual(fuzzywuzzy.extractBests(query, index, scorer=scorer, score_cutoff=cutoff, limit=3),
+                                 fuzzywuzzy.extractBests(query, self.choices, scorer=fuzzywuzzy.token_set_ratio,
+                                                         score_cutoff=cutoff, limit=3))
+                self.assertLessEqual(len(scored), len(self.choices))
+            del scored[:]
+            self.assertEqual(fuzzywuzzy.extractOne(query, index, scorer=scorer, score_cutoff=101), None)
+            self.assertEqual(len(scored), len(self.choices))
+
+    def testQGramFilter(self):
+        choices = self.choices + ["zarakana", "zarkana", "zarkan", "arkana las", "la vegas"]
+        for scorer in [fuzzywuzzy.ratio, fuzzywuzzy.QRatio, fuzzywuzzy.UQRatio]:
+            index = fuzzywuzzy.ChoiceIndex(choices, scorer=scorer)
+            for query in ["zarkana", "zarakana", "las vega", "new york metz"]:
+                for cutoff in [50, 80, 90, 100]:
+                    self.assertEqual(
+                        fuzzywuzzy.extractBests(query, index, scorer=scorer, score_cutoff=cutoff, limit=None),
+                        fuzzywuzzy.extractBests(query, choices, scorer=scorer, score_cutoff=cutoff, limit=None))
+                    self.assertEqual(fuzzywuzzy.extractOne(query, index, scorer=scorer, score_cutoff=cutoff),
+                                     fuzzywuzzy.extractOne(query, choices, scorer=scorer, score_cutoff=cutoff))
+        self.assertEqual(fuzzywuzzy.extractBests("zarakana", fuzzywuzzy.ChoiceIndex(choices, scorer=fuzzywuzzy.ratio),
+                                                 scorer=fuzzywuzzy.ratio, score_cutoff=80),
+                         [("zarakana", 100), ("zarkana", 93), ("zarkan", 86)])
+
+    def testLengthBand(self):
+        choices = ["mets", "new york mets", "new york mets vs atlanta braves",
+                   "new york mets vs atlanta braves vs chicago cubs vs boston red sox"] + self.choices
+        for scorer in [fuzzywuzzy.ratio, fuzzywuzzy.WRatio, fuzzywuzzy.UWRatio]:
+            index = fuzzywuzzy.ChoiceIndex(choices, scorer=scorer)
+            for query in ["mets", "new york mets", "braves vs mets"]:
+                for cutoff in [50, 61, 91, 96]:
+                    self.assertEqual(
+                        fuzzywuzzy.extractBests(query, index, scorer=scorer, score_cutoff=cutoff, limit=None),
+                        fuzzywuzzy.extractBests(query, choices, scorer=scorer, score_cutoff=cutoff, limit=None))
+                    self.assertEqual(fuzzywuzzy.extractOne(query, index, scorer=scorer, score_cutoff=cutoff),
+                                     fuzzywuzzy.extractOne(query, choices, scorer=scorer, score_cutoff=cutoff))
+
+    def testSharedTokenCandidatesAreLossy(self):
+        choices = ["new jersey devils", "bronx yankees"]
+        index = fuzzywuzzy.ChoiceIndex(choices, min_shared_tokens=1)
+        self.assertEqual(fuzzywuzzy.extractOne("yankeez bronks new", choices), ("bronx yankees", 67))
+        self.assertEqual(fuzzywuzzy.extractOne("yankeez bronks new", index), ("new jersey devils", 38))
+        self.assertEqual(fuzzywuzzy.extractOne("yankeez bronks", index), ("bronx yankees", 77))
+        self.assertEqual(len(list(fuzzywuzzy.extractWithoutOrder("yankeez bronks new", index))), 2)
+
+
+class BKTreeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.choices = [
+            "new york mets", "New York Mets!", "new york jets", "new york nets",
+            "zarkana", "zarakana", "zarkana las vegas", "braves vs mets", "",
+        ]
+
+    def bruteForce(self, query, max_distance):
+        query = fuzzywuzzy.full_process(query)
+        found = []
+        for position, choice in enumerate(self.choices):
+            d = fuzzywuzzy.indel_distance(query, fuzzywuzzy.full_process(choice))
+            if d <= max_distance:
+                found.append((d, position))
+        return [(self.choices[position], d) for d, position in sorted(found)]
+
+    def testFind(self):
+        tree = fuzzywuzzy.BKTree(self.choices)
+        self.assertEqual(len(tree), len(self.choices))
+        for query in ["new york mets", "NEW YORK METZ", "zarkana", "vegas", "", "x" * 80]:
+            for max_distance in [0, 1, 2, 4, 8, 100]:
+                self.assertEqual(tree.find(query, max_distance), self.bruteForce(query, max_distance))
+
+    def testNearestFirst(self):
+        tree = fuzzywuzzy.BKTree(self.choices)
+        self.assertEqual(tree.find("new york mets", 2),
+                         [("new york mets", 0), ("New York Mets!", 0), ("new york jets", 2), ("new york nets", 2)])
+        self.assertEqual(tree.find("zarkana", 1), [("zarkana", 0), ("zarakana", 1)])
+
+    def testDictionaryAndProcessor(self):
+        tree = fuzzywuzzy.BKTree(dict(enumerate(self.choices)), processor=None)
+        self.assertEqual(tree.find("new york mets", 1), [("new york mets", 0, 0)])
+
+    def testCustomDistance(self):
+        def length_distance(s1, s2):
+            return abs(len(s1) - len(s2))
+        tree = fuzzywuzzy.BKTree(self.choices, distance=length_distance)
+        self.assertEqual(tree.find("abcdefg", 0), [("zarkana", 0)])
+
+    def testEmpty(self):
+        self.assertEqual(fuzzywuzzy.BKTree([]).find("mets", 3), [])
+
+
+class DeletionIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.choices = ["mets", "jets", "nets", "braves", "cubs", "white sox", "red sox", "dodgers", "giants"]
+
+    def testWithin(self):
+        index = fuzzywuzzy.DeletionIndex(self.choices, max_distance=2)
+        for query in ["mets", "metz", "brave", "red socks", "xyz", ""]:
+            expected = [position for position, choice in enumerate(self.choices)
+                        if fuzzywuzzy.levenshtein_distance(query, choice) <= 2]
+            self.assertEqual(index.within(query), expected)
+
+    def testSubstitution(self):
+        index = fuzzywuzzy.DeletionIndex(self.choices, max_distance=1)
+        self.assertEqual(index.within("metz"), [0])
+        self.assertEqual(index.within("bets"), [0, 1, 2])
+
+    def testLevenshteinDistance(self):
+        for s1, s2, expected in [("mets", "metz", 1), ("kitten", "sitting", 3), ("", "mets", 4), ("abc", "abc", 0),
+                                 ("flaw", "lawn", 2)]:
+            self.assertEqual(fuzzywuzzy.levenshtein_distance(s1, s2), expected)
+            self.assertEqual(fuzzywuzzy.levenshtein_distance(s2, s1), expected)
+
+    def testExtractOne(self):
+        index = fuzzywuzzy.DeletionIndex(self.choices)
+        self.assertEqual(index.extractOne("METZ"), ("mets", 75))
+        self.assertEqual(index.extractOne("dodger"), ("dodgers", 92))
+        self.assertEqual(index.extractOne("red socks"), fuzzywuzzy.extractOne("red socks", self.choices))
+        self.assertEqual(index.extractOne("Mets"), ("mets", 100))
+
+    def testDictionary(self):
+        index = fuzzywuzzy.DeletionIndex(dict(enumerate(self.choices)), max_distance=1)
+        self.assertEqual(index.extractOne("giant"), ("giants", 91, 8))
+
+    def testFallback(self):
+        index = fuzzywuzzy.DeletionIndex(self.choices, max_distance=1)
+        self.assertEqual(index.extractOne("chicago cubs"), fuzzywuzzy.extractOne("chicago cubs", self.choices))
+        self.assertEqual(index.extractOne("metz", score_cutoff=80), fuzzywuzzy.extractOne("metz", self.choices,
+                                                                                          score_cutoff=80))
+
+    def testMemoryBound(self):
+        index = fuzzywuzzy.DeletionIndex(self.choices, max_entries=20)
+        self.assertFalse(index.complete)
+        self.assertEqual(index.extractOne("metz"), fuzzywuzzy.extractOne("metz", self.choices))
+        self.assertTrue(fuzzywuzzy.DeletionIndex(self.choices).complete)
+        index = fuzzywuzzy.DeletionIndex(self.choices + ["abcdefghij" * 80], max_entries=1000)
+        self.assertFalse(index.complete)
+
+
+class ParallelExtractTest(unittest.TestCase):
+
+    def setUp(self):
+        self.choices = [
+            "new york mets", "New York Mets!", "the wonderful new york mets", "new york mets vs atlanta braves",
+            "atlanta braves vs new york mets", "cirque du soleil - zarkana - las vegas", "zarkana las vegas",
+            "braves vs mets", "",
+        ] * 3
+
+    def testSameAsSerial(self):
+        for choices in [self.choices, dict(enumerate(self.choices))]:
+            for scorer in [fuzzywuzzy.WRatio, fuzzywuzzy.ratio, fuzzywuzzy.token_set_ratio]:
+                for limit in [1, 5, None]:
+                    self.assertEqual(
+                        fuzzywuzzy.extract_parallel("new york mets", choices, scorer=scorer, limit=limit,
+                                                    workers=2, chunk_size=4),
+                        fuzzywuzzy.extractBests("new york mets", choices, scorer=scorer, limit=limit))
+                self.assertEqual(
+                    fuzzywuzzy.extractOne_parallel("braves mets", choices, scorer=scorer, workers=2, chunk_size=5),
+                    fuzzywuzzy.extractOne("braves mets", choices, scorer=scorer))
+        self.assertEqual(
+            fuzzywuzzy.extract_parallel("vegas", self.choices, score_cutoff=80, workers=2, chunk_size=7),
+            fuzzywuzzy.extractBests("vegas", self.choices, score_cutoff=80))
+
+    def testUnpicklableProcessor(self):
+        def processor(s):
+            return s[:8]
+        self.assertEqual(fuzzywuzzy.extract_parallel("mets", self.choices, processor=processor, workers=2),
+                         fuzzywuzzy.extractBests("mets", self.choices, processor=processor))
+        self.assertEqual(fuzzywuzzy.extractOne_parallel("mets", self.choices, processor=lambda s: s, workers=2),
+                         fuzzywuzzy.extractOne("mets", self.choices, processor=lambda s: s))
+
+    def testUnpicklableChoices(self):
+        class Team(str):
+            pass
+        choices = [Team(choice) for choice in self.choices]
+        self.assertEqual(fuzzywuzzy.extract_parallel("mets", choices, workers=2),
+                         fuzzywuzzy.extractBests("mets", choices))
+
+    def testWorkersUseSelectedBackend(self):
+        # workers started on the default backend, as spawned ones are
+        previous = fuzzywuzzy.set_similarity_backend("indel")
+        try:
+            with ProcessPoolExecutor(1, initializer=fuzzywuzzy.set_similarity_backend,
+                                     initargs=("difflib",)) as executor:
+                self.assertEqual(
+                    fuzzywuzzy.extract_parallel("new atlanta chicago", self.choices, scorer=fuzzywuzzy.ratio,
+                                                limit=None, executor=executor),
+                    fuzzywuzzy.extractBests("new atlanta chicago", self.choices, scorer=fuzzywuzzy.ratio,
+                                            limit=None))
+        finally:
+            fuzzywuzzy.set_similarity_backend(previous)
+
+    def testEmpty(self):
+        self.assertEqual(fuzzywuzzy.extract_parallel("mets", []), [])
+        self.assertEqual(fuzzywuzzy.extractOne_parallel("mets", []), None)
+        self.assertEqual(fuzzywuzzy.extract_parallel("mets", self.choices, limit=0), [])
+
+
+class CdistTest(unittest.TestCase):
+
+    def setUp(self):
+        self.queries = ["new york mets", "NEW YORK METZ", "zarkana", ""]
+        self.choices = ["new york mets", "the wonderful new york mets", "zarakana las vegas", "braves vs mets"]
+
+    def expected(self, scorer, score_cutoff=0):
+        rows = []
+        for query in self.queries:
+            scores = dict((key, score) for _, score, key in fuzzywuzzy.extractWithoutOrder(
+                query, dict(enumerate(self.choices)), scorer=scorer))
+            rows.append([(scores[j] if scores[j] >= score_cutoff else 0) for j in range(len(self.choices))])
+        return rows
+
+    def testDense(self):
+        for scorer in [fuzzywuzzy.WRatio, fuzzywuzzy.UQRatio, fuzzywuzzy.ratio, fuzzywuzzy.partial_ratio,
+                       fuzzywuzzy.token_set_ratio, fuzzywuzzy.partial_token_sort_ratio]:
+            result = fuzzywuzzy.cdist(self.queries, self.choices, scorer=scorer)
+            self.assertEqual([list(row) for row in result], self.expected(scorer))
+        result = fuzzywuzzy.cdist(self.queries, self.choices, score_cutoff=85)
+        self.assertEqual([list(row) for row in result], self.expected(fuzzywuzzy.WRatio, 85))
+
+    @unittest.skipIf(fuzzywuzzy.numpy is None, "numpy is not installed")
+    def testNumpyArray(self):
+        result = fuzzywuzzy.cdist(self.queries, self.choices, score_cutoff=85)
+        self.assertIsInstance(result, fuzzywuzzy.numpy.ndarray)
+        self.assertEqual(result.shape, (len(self.queries), len(self.choices)))
+        self.assertEqual(result.tolist(), self.expected(fuzzywuzzy.WRatio, 85))
+        self.assertEqual(fuzzywuzzy.cdist([], self.choices).shape, (0, len(self.choices)))
+
+    @unittest.skipIf(fuzzywuzzy.numpy is not None, "numpy is installed")
+    def testListsWithoutNumpy(self):
+        result = fuzzywuzzy.cdist(self.queries, self.choices, score_cutoff=85)
+        self.assertEqual(result, self.expected(fuzzywuzzy.WRatio, 85))
+
+    def testSparse(self):
+        result = fuzzywuzzy.cdist(self.queries, self.choices, score_cutoff=85, sparse=True)
+        self.assertEqual(result, [(0, 0, 100), (0, 1, 90), (1, 0, 92), (1, 1, 86)])
+
+    def testWorkers(self):
+        self.assertEqual(fuzzywuzzy.cdist(self.queries, self.choices, workers=2, sparse=True),
+                         fuzzywuzzy.cdist(self.queries, self.choices, sparse=True))
+        self.assertEqual(
+            fuzzywuzzy.cdist(self.queries, self.choices, scorer=lambda q, c: len(c), processor=None, workers=2,
+                             sparse=True)[:2],
+            [(0, 0, 13), (0, 1, 27)])
+
+
+class AsyncExtractTest(unittest.TestCase):
+
+    def setUp(self):
+        self.choices = [
+            "new york mets", "New York Mets!", "the wonderful new york mets", "new york mets vs atlanta braves",
+            "atlanta braves vs new york mets", "cirque du soleil - zarkana - las vegas", "zarkana las vegas",
+            "braves vs mets", "",
+        ] * 3
+
+    def run_async(self, coroutine):
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(coroutine)
+        finally:
+            loop.close()
+
+    def testSameAsSync(self):
+        for choices in [self.choices, dict(enumerate(self.choices))]:
+            for scorer in [fuzzywuzzy.WRatio, fuzzywuzzy.ratio, fuzzywuzzy.token_set_ratio]:
+                for limit in [1, 5, None]:
+                    self.assertEqual(
+                        self.run_async(fuzzywuzzy.extract_async("new york mets", choices, scorer=scorer, limit=limit,
+                                                                slice_size=4)),
+                        fuzzywuzzy.extractBests("new york mets", choices, scorer=scorer, limit=limit))
+                self.assertEqual(
+                    self.run_async(fuzzywuzzy.extractOne_async("braves mets", choices, scorer=scorer, slice_size=5)),
+                    fuzzywuzzy.extractOne("braves mets", choices, scorer=scorer))
+
+    def testExecutors(self):
+        with ThreadPoolExecutor(2) as executor:
+            self.assertEqual(
+                self.run_async(fuzzywuzzy.extract_async("vegas", self.choices, score_cutoff=60, slice_size=4,
+                                                        executor=executor)),
+                fuzzywuzzy.extractBests("vegas", self.choices, score_cutoff=60))
+        with ProcessPoolExecutor(2) as executor:
+            self.assertEqual(
+                self.run_async(fuzzywuzzy.extractOne_async("vegas", self.choices, slice_size=4, executor=executor)),
+                fuzzywuzzy.extractOne("vegas", self.choices))
+            self.assertEqual(
+                self.run_async(fuzzywuzzy.extract_async("vegas", self.choices, processor=lambda s: s[:5],
+                                                        executor=executor)),
+                fuzzywuzzy.extract("vegas", self.choices, processor=lambda s: s[:5]))
+
+            class Team(str):
+                pass
+            choices = [Team(choice) for choice in self.choices]
+            self.assertEqual(self.run_async(fuzzywuzzy.extract_async("vegas", choices, executor=executor)),
+                             fuzzywuzzy.extract("vegas", choices))
+
+    def testAllResultsScoredLazily(self):
+        consumed = []
+
+        def choices():
+            for choice in self.choices * 10:
+                consumed.append(choice)
+                yield choice
+
+        async def extract():
+            task = asyncio.ensure_future(fuzzywuzzy.extract_async("mets", choices(), limit=None, slice_size=4))
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+            return len(consumed), await task
+        before_yield, results = self.run_async(extract())
+        self.assertLess(before_yield, len(self.choices) * 10)
+        self.assertEqual(results, fuzzywuzzy.extractBests("mets", self.choices * 10, limit=None))
+
+    def testPositionalArguments(self):
+        self.assertEqual(
+            self.run_async(fuzzywuzzy.extract_async("vegas", self.choices, fuzzywuzzy.full_process,
+                                                    fuzzywuzzy.WRatio, 60, 2)),
+            fuzzywuzzy.extractBests("vegas", self.choices, fuzzywuzzy.full_process, fuzzywuzzy.WRatio, 60, 2))
+
+    def testTimeout(self):
+        with self.assertRaises(asyncio.TimeoutError):
+            self.run_async(fuzzywuzzy.extract_async("mets", self.choices * 200, slice_size=1, timeout=0.001))
+
+    def testEmpty(self):
+        self.assertEqual(self.run_async(fuzzywuzzy.extract_async("mets", [])), [])
+        self.assertEqual(self.run_async(fuzzywuzzy.extractOne_async("mets", [])), None)
+
+
+class CacheTest(unittest.TestCase):
+
+    def setUp(self):
+        fuzzywuzzy.enable_cache(maxsize=4)
+
+    def tearDown(self):
+        fuzzywuzzy.disable_cache()
+
+    def testDisabledByDefault(self):
+        fuzzywuzzy.disable_cache()
+        self.assertEqual(fuzzywuzzy.cache_info(), None)
+        self.assertEqual(fuzzywuzzy.WRatio("new york mets", "new YORK mets"), 100)
+
+    def testSharedAcrossScorers(self):
+        fuzzywuzzy.token_sort_ratio("New York Mets", "mets new york")
+        fuzzywuzzy.token_set_ratio("New York Mets", "mets new york")
+        self.assertEqual(fuzzywuzzy.full_process("New York Mets", force_ascii=True), "new york mets")
+        info = fuzzywuzzy.cache_info()
+        self.assertEqual((info.hits, info.misses, info.currsize), (3, 2, 2))
+
+    def testScoresUnchanged(self):
+        pairs = [("new york mets", "new YORK mets"), ("atlanta braves vs new york mets", "new york mets"),
+                 ("psych olog", "olog psych"), ("", "mets"), ("Cirque du Soleil", "cirque du soleil - zarkana")]
+        for scorer in (fuzzywuzzy.QRatio, fuzzywuzzy.WRatio, fuzzywuzzy.UWRatio, fuzzywuzzy.token_set_ratio,
+                       fuzzywuzzy.partial_token_sort_ratio):
+            for s1, s2 in pairs:
+                fuzzywuzzy.disable_cache()
+                expected = scorer(s1, s2)
+                fuzzywuzzy.enable_cache(maxsize=4)
+                self.assertEqual(scorer(s1, s2), expected)
+                self.assertEqual(scorer(s1, s2), expected)
+
+    def testEvictsLeastRecentlyUsed(self):
+        for s in ["a", "b", "c", "d", "a", "e"]:
+            fuzzywuzzy.full_process(s)
+        info = fuzzywuzzy.cache_info()
+        self.assertEqual(info, fuzzywuzzy.CacheInfo(1, 5, 1, 4, 4))
+        fuzzywuzzy.full_process("a")
+        fuzzywuzzy.full_process("b")
+        self.assertEqual(fuzzywuzzy.cache_info()[:3], (2, 6, 2))
+
+    def testClear(self):
+        fuzzywuzzy.full_process("new york")
+        fuzzywuzzy.full_process("new york")
+        fuzzywuzzy.clear_cache()
+        self.assertEqual(fuzzywuzzy.cache_info(), fuzzywuzzy.CacheInfo(0, 0, 0, 4, 0))
+
+    def testEqualValuesOfOtherTypes(self):
+        self.assertEqual(fuzzywuzzy.full_process(1, True), "1")
+        self.assertEqual(fuzzywuzzy.full_process(1.0, True), "1 0")
+        self.assertEqual(fuzzywuzzy.full_process(True, True), "true")
+        self.assertEqual(fuzzywuzzy.WRatio(1.0, "1.0"), 100)
+
+    def testExtractCachesOnlyTheQuery(self):
+        choices = ["new york mets", "new york yankees", "atlanta braves", "chicago cubs", "mets", "braves"]
+        for scorer in (fuzzywuzzy.token_set_ratio, fuzzywuzzy.WRatio, fuzzywuzzy.ratio):
+            fuzzywuzzy.clear_cache()
+            fuzzywuzzy.extractBests("new york mets", choices, scorer=scorer)
+            fuzzywuzzy.extractBests("new york mets", choices, scorer=scorer)
+            info = fuzzywuzzy.cache_info()
+            self.assertEqual(info.evictions, 0)
+            self.assertLessEqual(info.currsize, 2)
+
+    def testInvalidMaxsize(self):
+        for maxsize in (None, 0, -1, 2.5):
+            with self.assertRaises(ValueError):
+                fuzzywuzzy.enable_cache(maxsize)
+
+    def testUnhashable(self):
+        self.assertEqual(fuzzywuzzy.ratio(["new", "york"], ["new", "york"]), 100)
+        self.assertEqual(fuzzywuzzy.cache_info().currsize, 0)
+
+
+class ScorerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.choices = ["new york mets", "New York Yankees", "atlanta braves vs new york mets",
+                        "chicago cubs", "", "Mets of New York"]
+
+    @staticmethod
+    def first_token_ratio(s1, s2, force_ascii=True, do_full_process=True):
+        if do_full_process:
+            s1 = fuzzywuzzy.full_process(s1, force_ascii)
+            s2 = fuzzywuzzy.full_process(s2, force_ascii)
+        return 100 if s1.split()[:1] == s2.split()[:1] else 0
+
+    def testPlainScorerMatchesBuiltinFastPath(self):
+        for func in (fuzzywuzzy.WRatio, fuzzywuzzy.ratio, fuzzywuzzy.token_set_ratio, fuzzywuzzy.UQRatio):
+            scorer = fuzzywuzzy.Scorer(func)
+            self.assertEqual(scorer("new york mets", "new YORK mets!"), func("new york mets", "new YORK mets!"))
+            for score_cutoff in (0, 60):
+                self.assertEqual(fuzzywuzzy.extractBests("york mets", self.choices, scorer=scorer,
+                                                         score_cutoff=score_cutoff),
+                                 fuzzywuzzy.extractBests("york mets", self.choices, scorer=func,
+                                                         score_cutoff=score_cutoff))
+
+    def testCustomScorerProcessedOnce(self):
+        processed = []
+
+        def first_token_contexts(c1, c2, score_cutoff=0):
+            processed.append(c2.processed)
+            return 100 if c1.tokens[:1] == c2.tokens[:1] else 0
+        scorer = fuzzywuzzy.Scorer(self.first_token_ratio, force_ascii=True, score_contexts=first_token_contexts)
+        expected = fuzzywuzzy.extract("NEW jersey", self.choices, scorer=self.first_token_ratio, limit=None)
+        self.assertEqual(fuzzywuzzy.extract("NEW jersey", self.choices, scorer=scorer, limit=None), expected)
+        self.assertEqual(processed, [fuzzywuzzy.full_process(c, True) for c in self.choices])
+        index = fuzzywuzzy.ChoiceIndex(self.choices, scorer=scorer)
+        self.assertEqual(fuzzywuzzy.extract("NEW jersey", index, scorer=scorer, limit=None), expected)
+        self.assertEqual(fuzzywuzzy.extractOne("new", index, scorer=scorer), ("new york mets", 100))
+
+    def testScorerWithoutContexts(self):
+        scorer = fuzzywuzzy.Scorer(self.first_token_ratio, force_ascii=False)
+        self.assertEqual(fuzzywuzzy.extract("mets", self.choices, scorer=scorer, limit=2),
+                         [("Mets of New York", 100), ("new york mets", 0)])
+        self.assertEqual(
+            [list(row) for row in fuzzywuzzy.cdist(["new"], self.choices[:2], scorer=scorer, processor=None)],
+            [list(row) for row in fuzzywuzzy.cdist(["new"], self.choices[:2], scorer=self.first_token_ratio,
+                                                   processor=None)])
+
+    def testPicklable(self):
+        scorer = pickle.loads(pickle.dumps(fuzzywuzzy._as_scorer(fuzzywuzzy.WRatio)))
+        self.assertEqual(scorer.func, fuzzywuzzy.WRatio)
+        self.assertEqual(scorer.length_band, fuzzywuzzy._wratio_length_band)
+
+
+class SimilarityBackendTest(unittest.TestCase):
+
+    def setUp(self):
+        self.previous = fuzzywuzzy.set_similarity_backend('indel')
+
+    def tearDown(self):
+        fuzzywuzzy.set_similarity_backend(self.previous)
+
+    def testIndelDistance(self):
+        self.assertEqual(fuzzywuzzy.lcs_length("kitten", "sitting"), 4)
+        self.assertEqual(fuzzywuzzy.indel_distance("kitten", "sitting"), 5)
+        self.assertEqual(fuzzywuzzy.indel_distance("", "abc"), 3)
+        self.assertEqual(fuzzywuzzy.indel_distance("abc", "abc"), 0)
+
+    def testIndelRatio(self):
+        self.assertEqual(fuzzywuzzy.ratio("new york mets", "new york mets"), 100)
+        self.assertEqual(fuzzywuzzy.ratio("new atlanta chicago", "new york braves"), 35)
+        self.assertEqual(fuzzywuzzy.ratio("cubs atlanta braves", "chicago new cubs"),
+                         fuzzywuzzy.ratio("chicago new cubs", "cubs atlanta braves"))
+        self.assertEqual(fuzzywuzzy.ratio("", ""), 0)
+
+    def testIndelDerivedScorers(self):
+        self.assertEqual(fuzzywuzzy.partial_ratio("new york mets", "the wonderful new york mets"), 100)
+        self.assertEqual(fuzzywuzzy.WRatio("new york mets vs atlanta braves",
+                                           "atlanta braves vs new york mets"), 95)
+
+    def testPrefixRatio(self):
+        long_string = "0123456789" * 25
+        for backend in fuzzywuzzy.similarity_backends.values():
+            for s1, s2 in [("mets", "mets new york"), ("a", "a b"), ("new york", "new york"),
+                           (long_string[:150], long_string[:199])]:
+                self.assertEqual(backend.prefix_ratio(len(s1), len(s2)), backend.ratio(s1, s2))
+        self.assertEqual(fuzzywuzzy.DifflibBackend().prefix_ratio(10, len(long_string)), None)
+        self.assertEqual(fuzzywuzzy.IndelBackend().prefix_ratio(10, len(long_string)),
+                         fuzzywuzzy.IndelBackend().ratio(long_string[:10], long_string))
+
+    def testTokenScorersOnLongStrings(self):
+        sect = " ".join(str(i) + "0123456789" * 3 for i in range(8))
+        s1 = sect + " mets"
+        s2 = "braves " + sect
+        for backend in ('indel', 'difflib'):
+            fuzzywuzzy.set_similarity_backend(backend)
+            expected = max(fuzzywuzzy.ratio(sect, sect + " mets"), fuzzywuzzy.ratio(sect, sect + " braves"),
+                           fuzzywuzzy.ratio(sect + " mets", sect + " braves"))
+            self.assertEqual(fuzzywuzzy.token_set_ratio(s1, s2), expected)
+            self.assertEqual(fuzzywuzzy.token_sort_ratio(s1, s1), fuzzywuzzy.ratio(s1, s1))
+
+    def testUnboundedBackendCutoff(self):
+        class JaccardBackend(fuzzywuzzy.SimilarityBackend):
+            def ratio(self, s1, s2):
+                return float(len(set(s1) & set(s2))) / len(set(s1) | set(s2))
+        fuzzywuzzy.set_similarity_backend(JaccardBackend())
+        self.assertEqual(fuzzywuzzy.ratio("aab", "ab"), 100)
+        self.assertEqual(fuzzywuzzy.ratio("aab", "ab", score_cutoff=90), 100)
+        self.assertEqual(fuzzywuzzy.partial_ratio("aaab", "ba", score_cutoff=90),
+                         fuzzywuzzy.partial_ratio("aaab", "ba"))
+        self.assertEqual(fuzzywuzzy.extractBests("ab", ["aab"], scorer=fuzzywuzzy.ratio, processor=None,
+                                                 score_cutoff=90), [("aab", 100)])
+        for scorer in (fuzzywuzzy.ratio, fuzzywuzzy.QRatio, fuzzywuzzy.WRatio):
+            index = fuzzywuzzy.ChoiceIndex(["aaaab", "xyz"], scorer=scorer)
+            self.assertEqual(fuzzywuzzy.extractBests("ab", index, scorer=scorer, score_cutoff=90),
+                             fuzzywuzzy.extractBests("ab", ["aaaab", "xyz"], scorer=scorer, score_cutoff=90))
+            self.assertEqual(fuzzywuzzy.extractBests("ab", index, scorer=scorer, score_cutoff=90)[0][0], "aaaab")
+
+    def testCompatibilityMode(self):
+        fuzzywuzzy.set_similarity_backend('difflib')
+        self.assertEqual(fuzzywuzzy.ratio("new atlanta chicago", "new york braves"), 29)
+        fuzzywuzzy.set_similarity_backend(fuzzywuzzy.IndelBackend())
+        self.assertEqual(fuzzywuzzy.ratio("new atlanta chicago", "new york braves"), 35)
+
+    def testPreparedRatio(self):
+        strings = ["new york mets", "the wonderful new york mets", "HSINCHUANG",
+                   "LSINJHUANG DISTRIC", "a" * 100, "a" * 99 + "b"]
+        for backend in fuzzywuzzy.similarity_backends.values():
+            for s1 in strings:
+                ratio_to = backend.prepare(s1)
+                for s2 in strings:
+                    self.assertEqual(ratio_to(s2), backend.ratio(s1, s2))
+
+    def testPartialRatioLongText(self):
+        text = "the wonderful new york mets " * 5 + "zarkana las vegas"
+        self.assertEqual(fuzzywuzzy.partial_ratio("zarakana las vegas", text), 97)
+        self.assertEqual(fuzzywuzzy.partial_ratio(text, "wonderful new york"), 100)
+
+    def testUnknownBackend(self):
+        self.assertRaises(ValueError, fuzzywuzzy.set_similarity_backend, 'nope')
+        self.assertEqual(fuzzywuzzy.similarity_backend.name, 'indel')
+
+
+class IndelRatioTest(RatioTest):
+    """Rerun every RatioTest with the indel backend and its bit-parallel kernel."""
+
+    def setUp(self):
+        RatioTest.setUp(self)
+        self.previous = fuzzywuzzy.set_similarity_backend('indel')
+        self.fixtures = [self.s1, self.s2, self.s3, self.s4, self.s5, self.s6, self.s7]
+        self.fixtures += self.cirque_strings + self.baseball_strings
+        self.fixtures += [fuzzywuzzy.full_process(s) for s in self.fixtures]
+
+    def tearDown(self):
+        fuzzywuzzy.set_similarity_backend(self.previous)
+
+    def testBitParallelMatchesDynamicProgramming(self):
+        for s1 in self.fixtures:
+            masks = fuzzywuzzy._pattern_masks(s1)
+            for s2 in self.fixtures:
+                self.assertEqual(fuzzywuzzy._lcs_bit_parallel(masks, len(s1), s2),
+                                 fuzzywuzzy._lcs_dynamic(s1, s2))
+
+    def testNeverBelowDifflib(self):
+        for s1 in self.fixtures:
+            for s2 in self.fixtures:
+                indel = fuzzywuzzy.ratio(s1, s2)
+                fuzzywuzzy.set_similarity_backend('difflib')
+                self.assertTrue(indel >= fuzzywuzzy.ratio(s1, s2))
+                fuzzywuzzy.set_similarity_backend('indel')
+
+    def testLongStrings(self):
+        s1 = "new york mets " * 10
+        s2 = "new york yankees " * 10
+        self.assertEqual(fuzzywuzzy.lcs_length(s1, s2), fuzzywuzzy._lcs_dynamic(s1, s2))
+
+
 class TestCodeFormat(unittest.TestCase):
     def test_pep8_conformance(self):
         pep8style = pycodestyle.StyleGuide(quiet=False)